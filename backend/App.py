@@ -1,67 +1,273 @@
-from flask import Flask, request, jsonify, session, redirect
+from flask import Blueprint, Flask, current_app, request, jsonify, session, redirect
+from flask.logging import default_handler
 from flask_cors import CORS
-from flask_sqlalchemy import SQLAlchemy
 import os
 from dotenv import load_dotenv
-from backend.auth_utils import generate_jwt, decode_jwt, token_required
+from backend.auth_utils import generate_jwt, decode_jwt, token_required, user_loader
 from backend.oauth_utils import google_oauth
-import traceback
 import secrets
+import atexit
+import click
+import json
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+import threading
+import hashlib
+import hmac
+import time
+import random
+from cachetools import TTLCache, TLRUCache
 from backend.dashboard_routes import dashboard_bp
+from backend.json_provider import OrjsonProvider
+from backend.http_cache import conditional_json, json_etag
+from backend.mailer import send_async, send_verification_email, send_password_reset_email
 from flask_migrate import Migrate
-from backend.models import db, User, PasswordResetToken, Follow
+from sqlalchemy import delete, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.pool import NullPool
+from backend.models import db, hash_password, verify_password, run_blocking, BCRYPT_ROUNDS, User, PasswordResetToken, Follow, WaitlistEntry
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Flask app
-app = Flask(__name__)
-
-app.register_blueprint(dashboard_bp)
-
-# Configuration
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///projecthuman.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-migrate = Migrate(app,db)
-
-# Initialize extensions
-db.init_app(app)
-cors = CORS(app, 
-    origins=os.getenv('CORS_ORIGINS', 'http://localhost:3000').split(','),
-    supports_credentials=True)  # Allow credentials for session management
-
-# Create database tables
-with app.app_context():
-    db.create_all()
-    PasswordResetToken.cleanup_expired()
+# API routes; registered on the app by create_app()
+api_bp = Blueprint('api', __name__, cli_group=None)
+
+migrate = Migrate()
+cors = CORS()
+_CORS_ORIGINS = tuple(
+    origin.strip()
+    for origin in os.getenv('CORS_ORIGINS', 'http://localhost:3000').split(',')
+    if origin.strip()
+)
+
+# Log records are formatted and written by a background listener thread, so
+# a slow stderr never stalls a request
+_log_queue = queue.Queue(-1)
+_log_listener = QueueListener(_log_queue, default_handler, respect_handler_level=True)
+
+def init_logging(app):
+    """Route the app's log records through the background listener.
+    Apps built from this module share one named logger, so the queue handler
+    is added, and the listener started, only once per process.
+    """
+    app.logger.removeHandler(default_handler)
+    if not any(isinstance(handler, QueueHandler) for handler in app.logger.handlers):
+        app.logger.addHandler(QueueHandler(_log_queue))
+        _log_listener.start()
+        atexit.register(_log_listener.stop)
+    # Flask leaves the logger unset outside debug, which falls back to the
+    # root logger's WARNING and hides the startup and cleanup info lines
+    app.logger.setLevel(logging.DEBUG if app.debug else logging.INFO)
+
+# Log queries slower than this many seconds. Queries also run outside app
+# contexts, so they are logged by name rather than through current_app; the
+# module name is also the app's name, so this is the logger create_app sets up.
+SLOW_QUERY_SECONDS = int(os.getenv('SLOW_QUERY_MS', '100')) / 1000
+_query_logger = logging.getLogger(__name__)
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _log_slow_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start_time'].pop()
+    if elapsed > SLOW_QUERY_SECONDS:
+        _query_logger.warning("Slow query (%.0f ms): %s", elapsed * 1000, statement)
+
+@api_bp.cli.command('cleanup-expired-tokens')
+def cleanup_expired_tokens():
+    """Delete expired password reset tokens. Run from cron or the gunicorn master (RUN_SCHEDULER=1)."""
+    deleted = PasswordResetToken.cleanup_expired()
+    click.echo(f"Deleted {deleted} expired password reset tokens")
+
+# Serialized users for read-only endpoints, keyed by user id. Each entry
+# holds the user dict and an ETag derived from its contents. The cache is
+# per worker process: a change made through one worker evicts only that
+# worker's entry, so others may serve the old user for up to USER_CACHE_TTL
+# seconds.
+USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', '60'))
+_user_dict_cache = TTLCache(maxsize=5000, ttl=USER_CACHE_TTL)
+_user_dict_lock = threading.Lock()
+
+def get_user_entry(user_id):
+    """Return (user_dict, etag) for the user, or None if the user does not exist"""
+    with _user_dict_lock:
+        entry = _user_dict_cache.get(user_id)
+    if entry is None:
+        user_dict = User.find_dict_by_id(user_id)
+        if not user_dict:
+            return None
+        entry = (user_dict, json_etag(current_app.json.dumps(user_dict, sort_keys=True)))
+        with _user_dict_lock:
+            _user_dict_cache[user_id] = entry
+    return entry
+
+def user_json_response(user_id, body):
+    """JSON response for a user endpoint, or a bodiless 304 when the client's
+    If-None-Match still matches the user's ETag"""
+    entry = get_user_entry(user_id)
+    if not entry:
+        return None
+    user_dict, etag = entry
+    return conditional_json({**body, 'user': user_dict}, etag=etag)
+
+@user_loader
+def load_user_dict(user_id):
+    """Serialized user for auth_utils.current_user_dict"""
+    entry = get_user_entry(user_id)
+    return entry[0] if entry else None
+
+def invalidate_user_dict(user_id):
+    """Drop a cached user after its record changes"""
+    with _user_dict_lock:
+        _user_dict_cache.pop(user_id, None)
+
+# Any change to a user (password, verification, OAuth linking) or its
+# deletion drops its cached dict, and with it the ETag, once the change
+# commits. Evicting at flush time would let a concurrent read re-cache the
+# old row. Bulk UPDATE/DELETE statements bypass these hooks.
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _mark_changed_user(mapper, connection, target):
+    object_session(target).info.setdefault('changed_user_ids', set()).add(target.id)
+
+@event.listens_for(Session, 'after_commit')
+def _evict_changed_users(session):
+    for user_id in session.info.pop('changed_user_ids', ()):
+        invalidate_user_dict(user_id)
+
+# Recently issued 60 minute tokens, reused for 15 seconds so repeat logins
+# skip signing while the returned token keeps at least 59 minutes of life
+_issued_token_cache = TTLCache(maxsize=2048, ttl=15)
+_issued_token_lock = threading.Lock()
+
+def issue_user_token(user):
+    """Return a JWT for the user, reusing one signed in the last few seconds"""
+    key = (user.id, user.username)
+    with _issued_token_lock:
+        token = _issued_token_cache.get(key)
+    if token is None:
+        token = generate_jwt({'user_id': user.id, 'username': user.username}, expires_in_minutes=60)
+        with _issued_token_lock:
+            _issued_token_cache[key] = token
+    return token
+
+# Successful password checks, kept briefly so client retries skip bcrypt.
+# Opt-in with USE_VERIFY_PASSWORD_CACHE=1. The stored hash is part of the
+# key, so a password change misses the cache.
+USE_VERIFY_PASSWORD_CACHE = os.getenv('USE_VERIFY_PASSWORD_CACHE', '0') == '1'
+_login_cache = TTLCache(maxsize=4096, ttl=10)
+# Failed (email, password) pairs, kept 5-15 seconds so repeated probes with
+# the same guess are answered without bcrypt. The jitter keeps expiry
+# times from being predictable.
+_failed_login_cache = TLRUCache(maxsize=4096, ttu=lambda _key, _value, now: now + random.uniform(5, 15))
+_login_lock = threading.Lock()
+
+def _credential_key(*parts):
+    """HMAC of credential parts under the app secret, so cache keys held in
+    memory cannot be brute-forced back to passwords without the secret"""
+    secret = current_app.config['SECRET_KEY'].encode()
+    return hmac.new(secret, '|'.join(parts).encode(), hashlib.sha256).digest()
+
+def check_login_password(user, email, password):
+    """Verify a login password, reusing recent results for the same credentials.
+    Unknown emails and OAuth-only accounts are checked against a dummy hash.
+    """
+    email = email.lower()
+    failed_key = _credential_key(email, password)
+    with _login_lock:
+        if failed_key in _failed_login_cache:
+            return False
+    
+    key = None
+    if user is None or not user.password_hash:
+        run_blocking(verify_password, current_app.extensions['dummy_password_hash'], password)
+        is_valid = False
+    else:
+        if USE_VERIFY_PASSWORD_CACHE:
+            key = _credential_key(email, user.password_hash, password)
+            with _login_lock:
+                if _login_cache.get(key):
+                    return True
+        is_valid = user.check_password(password)
+    
+    with _login_lock:
+        if not is_valid:
+            _failed_login_cache[failed_key] = True
+        elif key is not None:
+            _login_cache[key] = True
+    return is_valid
+
+def forget_failed_login(email, password):
+    """Drop a cached failure once the password becomes valid (after a reset or registration)"""
+    failed_key = _credential_key(email.lower(), password)
+    with _login_lock:
+        _failed_login_cache.pop(failed_key, None)
+
+# String fields read from each JSON body, as (name, strip whitespace)
+REGISTER_FIELDS = (('username', True), ('email', True), ('password', False))
+LOGIN_FIELDS = (('email', True), ('password', False))
+PASSWORD_RESET_REQUEST_FIELDS = (('email', True),)
+PASSWORD_RESET_FIELDS = (('token', True), ('password', False))
+
+def read_json_fields(fields):
+    """Read string fields from the JSON request body.
+    Returns None if the body is empty or not a JSON object. Fields that are
+    missing or not strings come back as ''.
+    """
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data, dict):
+        return None
+    values = []
+    for name, strip in fields:
+        value = data.get(name)
+        if not isinstance(value, str):
+            value = ''
+        values.append(value.strip() if strip else value)
+    return values
+
+# Bodies of responses that never change, encoded to bytes once at import in
+# the same compact, key-sorted form jsonify produces. A fresh Response is
+# still built per request because after_request hooks (CORS) add headers to
+# it; sharing one Response would leak those headers between requests.
+def _encode_static(obj):
+    return (json.dumps(obj, separators=(',', ':'), sort_keys=True) + '\n').encode()
+
+_HOME_BODY = _encode_static({
+    'message': 'Uplifty API',
+    'status': 'running',
+    'version': '1.0.0'
+})
+_HEALTH_BODY = _encode_static({'status': 'healthy'})
+_NOT_FOUND_BODY = _encode_static({'error': 'Not found', 'message': 'Resource not found'})
+_INTERNAL_ERROR_BODY = _encode_static({'error': 'Internal server error', 'message': 'An unexpected error occurred'})
+
+def static_json(body, status=200):
+    """Build a JSON response around a pre-encoded body"""
+    return current_app.response_class(body, status=status, mimetype='application/json')
 
 # Routes
-@app.route('/')
+@api_bp.route('/')
 def home():
-    return jsonify({
-        'message': 'Uplifty API',
-        'status': 'running',
-        'version': '1.0.0'
-    })
+    return static_json(_HOME_BODY)
 
-@app.route('/api/health')
+@api_bp.route('/api/health')
 def health_check():
-    return jsonify({'status': 'healthy'})
+    return static_json(_HEALTH_BODY)
 
-@app.route('/api/auth/register', methods=['POST'])
+@api_bp.route('/api/auth/register', methods=['POST'])
 def register():
     """Register a new user"""
     try:
-        data = request.get_json()
-        
-        if not data:
+        fields = read_json_fields(REGISTER_FIELDS)
+        if fields is None:
             return jsonify({'error': 'No data provided'}), 400
         
-        username = data.get('username', '').strip()
-        email = data.get('email', '').strip()
-        password = data.get('password', '')
+        username, email, password = fields
         
         # Validation
         if not username or not email or not password:
@@ -71,13 +277,14 @@ def register():
             }), 400
         
         # Check if user already exists
-        if User.find_by_email(email):
+        email_taken, username_taken = User.find_conflict(email, username)
+        if email_taken:
             return jsonify({
                 'error': 'User already exists',
                 'message': 'An account with this email already exists'
             }), 409
             
-        if User.find_by_username(username):
+        if username_taken:
             return jsonify({
                 'error': 'Username taken',
                 'message': 'This username is already taken'
@@ -87,18 +294,22 @@ def register():
         try:
             user = User(username=username, email=email, password=password)
 
-            #generates the secret token for the user to verify email.
-            emailtoken = secrets.token_urlsafe(32)
-            user.email_verification_token = emailtoken
             user.is_verified = False
             db.session.add(user)
+            db.session.flush()  # Assign user.id, which the verification token embeds
+
+            #generates the secret token for the user to verify email.
+            emailtoken = user.generate_email_verification_token()
             db.session.commit()
+            # A login tried before the account existed may have cached this
+            # password as wrong
+            forget_failed_login(email, password)
             
             # Generate JWT token
-            token = generate_jwt({'user_id': user.id, 'username': user.username}, expires_in_minutes=60)
+            token = issue_user_token(user)
             
             #this is the code to verify the account
-            print(f"[DEV] Verify this account: http://localhost:3000/verify-email?token={emailtoken}")
+            send_async(send_verification_email, user.email, emailtoken)
             
             return jsonify({
                 'message': 'User registered successfully. Please verify your email',
@@ -119,17 +330,15 @@ def register():
             'message': 'An unexpected error occurred'
         }), 500
 
-@app.route('/api/auth/login', methods=['POST'])
+@api_bp.route('/api/auth/login', methods=['POST'])
 def login():
     """Authenticate user and return JWT token"""
     try:
-        data = request.get_json()
-        
-        if not data:
+        fields = read_json_fields(LOGIN_FIELDS)
+        if fields is None:
             return jsonify({'error': 'No data provided'}), 400
         
-        email = data.get('email', '').strip()
-        password = data.get('password', '')
+        email, password = fields
         
         if not email or not password:
             return jsonify({
@@ -137,9 +346,9 @@ def login():
                 'message': 'Email and password are required'
             }), 400
         
-        # Find user
-        user = User.find_by_email(email)
-        if not user or not user.check_password(password):
+        # Find user, loading only the columns login reads
+        user = User.find_by_email(email, columns=User.LOGIN_COLUMNS)
+        if not check_login_password(user, email, password):
             return jsonify({
                 'error': 'Invalid credentials',
                 'message': 'Email or password is incorrect'
@@ -151,8 +360,14 @@ def login():
                 'message': 'Your account has been disabled'
             }), 401
         
+        # Upgrade the stored hash while the plaintext is at hand if the
+        # configured bcrypt cost has changed since it was made
+        if user.password_needs_rehash():
+            user.set_password(password)
+            db.session.commit()
+        
         # Generate JWT token
-        token = generate_jwt({'user_id': user.id, 'username': user.username}, expires_in_minutes=60)
+        token = issue_user_token(user)
         
         # Check if email is verified and add warning if not
         response_data = {
@@ -173,21 +388,19 @@ def login():
             'message': 'An unexpected error occurred'
         }), 500
 
-@app.route('/api/auth/me', methods=['GET'])
+@api_bp.route('/api/auth/me', methods=['GET'])
 @token_required
 def get_current_user(current_user_id):
     """Get current user information"""
     try:
-        user = User.find_by_id(current_user_id)
-        if not user:
+        response = user_json_response(current_user_id, {})
+        if response is None:
             return jsonify({
                 'error': 'User not found',
                 'message': 'User account no longer exists'
             }), 404
         
-        return jsonify({
-            'user': user.to_dict()
-        })
+        return response
         
     except Exception as e:
         return jsonify({
@@ -195,7 +408,7 @@ def get_current_user(current_user_id):
             'message': 'An unexpected error occurred'
         }), 500
 
-@app.route('/api/auth/logout', methods=['POST'])
+@api_bp.route('/api/auth/logout', methods=['POST'])
 @token_required
 def logout(current_user_id):
     """Logout user (client-side token removal)"""
@@ -204,18 +417,20 @@ def logout(current_user_id):
         'note': 'Please remove the token from client storage'
     })
 
-@app.route('/api/protected', methods=['GET'])
+@api_bp.route('/api/protected', methods=['GET'])
 @token_required
 def protected_route(current_user_id):
     """Example protected route"""
-    user = User.find_by_id(current_user_id)
-    return jsonify({
-        'message': 'This is a protected route',
-        'user': user.to_dict() if user else None
-    })
+    response = user_json_response(current_user_id, {'message': 'This is a protected route'})
+    if response is None:
+        return jsonify({
+            'message': 'This is a protected route',
+            'user': None
+        })
+    return response
 
 
-@app.route('/api/auth/request-password-reset', methods=['POST'])
+@api_bp.route('/api/auth/request-password-reset', methods=['POST'])
 def request_password_reset():
     """Request a password reset token for a user account.
     
@@ -223,11 +438,11 @@ def request_password_reset():
     Returns: JSON response with success message (200) or error (400/500)
     """
     try:
-        data = request.get_json()
-        if not data:
+        fields = read_json_fields(PASSWORD_RESET_REQUEST_FIELDS)
+        if fields is None:
             return jsonify({'error': 'No data provided'}), 400
         
-        email = data.get('email', '').strip()
+        email, = fields
         if not email:
             return jsonify({'error': 'Email is required'}), 400
         
@@ -237,21 +452,20 @@ def request_password_reset():
             # Return generic message to prevent email enumeration
             return jsonify({'message': 'If an account with that email exists, a password reset link has been sent.'}), 200
         
-        # Clean up existing unused tokens for this user
-        existing_tokens = PasswordResetToken.query.filter_by(user_id=user.id, used=False).all()
-        for token in existing_tokens:
-            db.session.delete(token)
+        # Clean up existing unused tokens for this user in one DELETE
+        db.session.execute(
+            delete(PasswordResetToken)
+            .where(PasswordResetToken.user_id == user.id, PasswordResetToken.used == False)
+            .execution_options(synchronize_session=False)
+        )
         
         # Create new password reset token
         reset_token = PasswordResetToken(user_id=user.id)
         db.session.add(reset_token)
         db.session.commit()
         
-        # TODO: Replace with actual email sending in production
-        # For development: token is logged (remove in production)
-        if app.debug:
-            print(f"[DEV] Reset token for {email}: {reset_token.token}")
-        # In production, this would send an email instead
+        # Email the token without holding up the response
+        send_async(send_password_reset_email, email, reset_token.raw_token)
         
         return jsonify({'message': 'If an account with that email exists, a password reset link has been sent.'}), 200
         
@@ -259,7 +473,7 @@ def request_password_reset():
         db.session.rollback()
         return jsonify({'error': 'Request failed'}), 500
 
-@app.route('/api/auth/reset-password', methods=['POST'])
+@api_bp.route('/api/auth/reset-password', methods=['POST'])
 def reset_password():
     """Reset a user's password using a valid reset token.
     
@@ -267,12 +481,11 @@ def reset_password():
     Returns: JSON response with success message (200) or error (400/500)
     """
     try:
-        data = request.get_json()
-        if not data:
+        fields = read_json_fields(PASSWORD_RESET_FIELDS)
+        if fields is None:
             return jsonify({'error': 'No data provided'}), 400
         
-        token = data.get('token', '').strip()
-        new_password = data.get('password', '')
+        token, new_password = fields
         
         if not token or not new_password:
             return jsonify({'error': 'Token and password are required'}), 400
@@ -288,28 +501,27 @@ def reset_password():
             return jsonify({'error': 'Invalid token'}), 400
         
         try:
-            # Update user password and mark token as used
+            # Update user password and mark token as used in a single commit
             user.set_password(new_password)
             reset_token.mark_as_used()
             db.session.commit()
+            forget_failed_login(user.email, new_password)
             return jsonify({'message': 'Password reset successfully'}), 200
         except ValueError as e:
             return jsonify({'error': str(e)}), 400
         
     except Exception as e:
         db.session.rollback()
-        print(f"Password reset error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        current_app.logger.exception("Password reset error")
         return jsonify({'error': 'Password reset failed'}), 500
 #this is the code to verify the email token
-@app.route('/api/auth/verify-email', methods=['GET'])
+@api_bp.route('/api/auth/verify-email', methods=['GET'])
 def verify_email():
     token = request.args.get('token', '')
     if not token:
         return jsonify({'error': 'Missing token'}), 400
 
-    user = User.query.filter_by(email_verification_token=token).first()
+    user = User.find_by_email_verification_token(token)
     if not user:
         return jsonify({'error': 'Invalid or expired token'}), 400
 
@@ -318,7 +530,7 @@ def verify_email():
     db.session.commit()
     return jsonify({'message': 'Email verified successfully!'}), 200
 
-@app.route('/api/auth/resend-verification', methods=['POST'])
+@api_bp.route('/api/auth/resend-verification', methods=['POST'])
 @token_required
 def resend_verification(current_user_id):
     """Resend email verification token for current user"""
@@ -337,12 +549,11 @@ def resend_verification(current_user_id):
             }), 200
         
         # Generate new verification token
-        emailtoken = secrets.token_urlsafe(32)
-        user.email_verification_token = emailtoken
+        emailtoken = user.generate_email_verification_token()
         db.session.commit()
         
-        # For development: print verification link
-        print(f"[DEV] Verify this account: http://localhost:3000/verify-email?token={emailtoken}")
+        # Email the verification link without holding up the response
+        send_async(send_verification_email, user.email, emailtoken)
         
         return jsonify({
             'message': 'Verification email sent. Please check your email.',
@@ -356,7 +567,7 @@ def resend_verification(current_user_id):
             'message': 'An unexpected error occurred'
         }), 500
 
-@app.route('/api/auth/google', methods=['GET'])
+@api_bp.route('/api/auth/google', methods=['GET'])
 def google_auth():
     """Initiate Google OAuth flow"""
     try:
@@ -377,7 +588,7 @@ def google_auth():
             'message': 'Google OAuth is not properly configured'
         }), 500
 
-@app.route('/api/auth/google/callback', methods=['GET'])
+@api_bp.route('/api/auth/google/callback', methods=['GET'])
 def google_callback():
     """Handle Google OAuth callback"""
     try:
@@ -451,12 +662,10 @@ def google_callback():
         return redirect(f'http://localhost:3000/oauth/callback?token={token}')
         
     except Exception as e:
-        print(f"OAuth callback error: {e}")
-        import traceback
-        traceback.print_exc()
+        current_app.logger.exception("OAuth callback error")
         return redirect(f'http://localhost:3000/?error=oauth_error&message=Authentication failed')
 
-@app.route('/api/auth/google/verify', methods=['POST'])
+@api_bp.route('/api/auth/google/verify', methods=['POST'])
 def google_verify():
     """Verify Google ID token (for client-side OAuth)"""
     try:
@@ -521,38 +730,37 @@ def google_verify():
             'message': 'An unexpected error occurred'
         }), 500
     
-@app.route('/api/users/<int:user_id>/follow', methods=['POST'])
+@api_bp.route('/api/users/<int:user_id>/follow', methods=['POST'])
 @token_required
 def follow_user(current_user_id, user_id):
     """Follow a user"""
     if current_user_id == user_id:
         return jsonify({'error': 'You cannot follow yourself.'}), 400
 
-    # search if followed or not
-    existing = Follow.query.filter_by(follower_id=current_user_id, followee_id=user_id).first()
-    if existing:
-        return jsonify({'message': 'Already following'}), 200
-
-    # add record of following
-    new_follow = Follow(follower_id=current_user_id, followee_id=user_id)
-    db.session.add(new_follow)
+    # add record of following unless it already exists
+    created = Follow.create_if_absent(current_user_id, user_id)
     db.session.commit()
+    if not created:
+        return jsonify({'message': 'Already following'}), 200
     return jsonify({'message': f'Now following user {user_id}'}), 201
 
 
-@app.route('/api/users/<int:user_id>/unfollow', methods=['DELETE'])
+@api_bp.route('/api/users/<int:user_id>/unfollow', methods=['DELETE'])
 @token_required
 def unfollow_user(current_user_id, user_id):
     """Unfollow a user"""
-    follow = Follow.query.filter_by(follower_id=current_user_id, followee_id=user_id).first()
-    if not follow:
+    deleted = db.session.execute(
+        delete(Follow)
+        .where(Follow.follower_id == current_user_id, Follow.followee_id == user_id)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    if not deleted:
         return jsonify({'message': 'Not following this user'}), 404
 
-    db.session.delete(follow)
-    db.session.commit()
     return jsonify({'message': f'Unfollowed user {user_id}'}), 200
 
-@app.route('/api/waitlist', methods=['POST'])
+@api_bp.route('/api/waitlist', methods=['POST'])
 def join_waitlist():
     data = request.get_json()
     if not data:
@@ -579,18 +787,87 @@ def join_waitlist():
     return jsonify({'message': 'Waitlist entry created.'}), 201
 
 # Error handlers
-@app.errorhandler(404)
+@api_bp.app_errorhandler(404)
 def not_found(error):
-    return jsonify({'error': 'Not found', 'message': 'Resource not found'}), 404
+    return static_json(_NOT_FOUND_BODY, 404)
 
-@app.errorhandler(500)
+@api_bp.app_errorhandler(500)
 def internal_error(error):
-    return jsonify({'error': 'Internal server error', 'message': 'An unexpected error occurred'}), 500
+    return static_json(_INTERNAL_ERROR_BODY, 500)
+
+def create_app(config=None):
+    """Create and configure the Flask application.
+    Settings in config (e.g. from tests) override those read from the environment.
+    """
+    app = Flask(__name__)
+    app.json = OrjsonProvider(app)
+    init_logging(app)
+
+    # Configuration
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///projecthuman.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['BCRYPT_LOG_ROUNDS'] = BCRYPT_ROUNDS
+    # Raise on lazy relationship loads from the User finders (dev/CI)
+    app.config['SQLA_STRICT_LOAD'] = os.getenv('SQLA_STRICT_LOAD') == '1'
+    app.config.update(config or {})
+
+    # Connection pool sizing for server databases. SQLite files get no pool:
+    # opening one is cheap, and pooled connections only hold the file lock
+    # between requests. In-memory SQLite keeps Flask-SQLAlchemy's StaticPool.
+    # The compiled statement cache is sized well above the number of distinct
+    # statements the app issues, so none are evicted and recompiled.
+    engine_options = {'query_cache_size': int(os.getenv('DB_QUERY_CACHE_SIZE', 1200))}
+    db_url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if db_url.get_backend_name() != 'sqlite':
+        engine_options.update({
+            'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+            'max_overflow': int(os.getenv('DB_POOL_OVERFLOW', 20)),
+            'pool_pre_ping': True,
+            'pool_recycle': 1800,
+        })
+    elif db_url.database not in (None, '', ':memory:'):
+        engine_options['poolclass'] = NullPool
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+
+    # Initialize extensions
+    db.init_app(app)
+    migrate.init_app(app, db)
+    cors.init_app(app,
+        origins=_CORS_ORIGINS,
+        supports_credentials=True,  # Allow credentials for session management
+        max_age=86400)  # Let browsers cache preflight responses for a day
+
+    app.register_blueprint(api_bp)
+    app.register_blueprint(dashboard_bp)
+
+    # Logins for unknown emails are checked against this hash, so they cost
+    # the same bcrypt work as real accounts and do not reveal which emails
+    # exist. Creating it doubles as the startup benchmark.
+    rounds = app.config['BCRYPT_LOG_ROUNDS']
+    bcrypt_start = time.perf_counter()
+    app.extensions['dummy_password_hash'] = hash_password(secrets.token_urlsafe(16), rounds)
+    app.logger.info("bcrypt cost %d: %.0f ms per hash", rounds, (time.perf_counter() - bcrypt_start) * 1000)
+
+    # Create database tables. Deployments that manage the schema with
+    # migrations set AUTO_MIGRATE=0 to skip this on every worker start.
+    if os.getenv('AUTO_MIGRATE', '1') == '1':
+        with app.app_context():
+            db.create_all()
+
+    return app
+
+app = create_app()
 
 if __name__ == '__main__':
+    # The Werkzeug server is for local development only
+    if os.getenv('FLASK_DEBUG', 'False').lower() != 'true':
+        raise SystemExit("Set FLASK_DEBUG=true for the development server, or run "
+                         "gunicorn -c backend/gunicorn_conf.py backend.wsgi:app")
     app.run(
         host='0.0.0.0',
         port=int(os.getenv('PORT', 5000)),
-        debug=os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
+        debug=True,
+        threaded=True
     )
 
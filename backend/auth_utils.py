@@ -1,15 +1,57 @@
 import jwt
-import datetime as dt
+import hashlib
+import threading
+import time
 from functools import wraps
-from flask import current_app, request, jsonify
+from flask import current_app, g, request, jsonify
+from cachetools import TLRUCache
 import os
+import string
+
+__all__ = [
+    'JWTManager',
+    'generate_jwt',
+    'decode_jwt',
+    'user_loader',
+    'current_user_dict',
+    'get_current_user_from_token',
+    'token_required',
+]
+
+# Payloads of recently verified tokens, keyed by a digest of the signing
+# secret and the raw token. Only successful decodes are stored, never
+# failures, and an entry lives at most 60 seconds and never past the
+# token's own expiration.
+_decoded_token_cache = TLRUCache(
+    maxsize=10000,
+    ttu=lambda key, payload, now: min(now + 60, payload['exp']),
+    timer=time.time,
+)
+_decoded_token_lock = threading.Lock()
+
+# Decoder and options built once instead of per call. Every token this app
+# issues carries exp, iat and nbf, so tokens missing one are rejected.
+_JWT = jwt.PyJWT()
+_JWT_ALGORITHMS = ["HS256"]
+_JWT_DECODE_OPTIONS = {"require": ["exp", "iat", "nbf"]}
+
+# str.translate table deleting the characters a compact JWT may contain;
+# anything left over means the token is malformed
+_JWT_CHARS_DELETE = dict.fromkeys(map(ord, string.ascii_letters + string.digits + '-_.'))
+_MIN_JWT_LENGTH = 20
+
+# Returns the serialized user for an id (or None); registered by the app
+_user_loader = None
 
 class JWTManager:
     """JWT Token management with security best practices"""
     
     @staticmethod
     def get_secret_key():
-        """Get secret key from environment with fallback"""
+        """
+        Get secret key from environment with fallback.
+        Read on every call, so each app's own SECRET_KEY is used.
+        """
         secret_key = os.getenv('JWT_SECRET_KEY')
         if not secret_key:
             # In production, this should always come from environment
@@ -27,38 +69,77 @@ def generate_jwt(payload: dict, expires_in_minutes: int = 15) -> str:
     Returns:
         str: Encoded JWT token
     """
-    payload_copy = payload.copy()
-    now = dt.datetime.now(dt.timezone.utc)
-    payload_copy.update({
+    # Integer epoch seconds, which is what PyJWT would encode datetimes to
+    now = int(time.time())
+    claims = {
+        **payload,
         "iat": now,  # Issued at
-        "exp": now + dt.timedelta(minutes=expires_in_minutes),  # Expiration
+        "exp": now + expires_in_minutes * 60,  # Expiration
         "nbf": now   # Not before
-    })
+    }
     
     secret_key = JWTManager.get_secret_key()
-    token = jwt.encode(payload_copy, secret_key, algorithm="HS256")
+    token = jwt.encode(claims, secret_key, algorithm="HS256")
     return token
 
 def decode_jwt(token: str) -> dict | None:
     """
     Decode a JWT token. Returns None if invalid.
     
+    Recently decoded tokens are served from a short-lived cache, and
+    malformed ones are rejected without any hashing. Each call returns its
+    own copy of the payload, so callers may modify it.
+    
     Args:
         token (str): JWT token to decode
         
     Returns:
         dict: Decoded payload or None if invalid
     """
+    # Reject malformed input before hashing or verifying anything
+    if (not isinstance(token, str) or len(token) < _MIN_JWT_LENGTH
+            or token.count('.') != 2 or token.translate(_JWT_CHARS_DELETE)):
+        return None
+    
+    secret_key = JWTManager.get_secret_key()
+    key = hashlib.sha256(f"{secret_key}:{token}".encode()).digest()[:16]
+    with _decoded_token_lock:
+        decoded = _decoded_token_cache.get(key)
+    if decoded is not None:
+        return dict(decoded)
+    
     try: 
-        secret_key = JWTManager.get_secret_key()
-        decoded = jwt.decode(token, secret_key, algorithms=["HS256"])
-        return decoded
+        decoded = _JWT.decode(token, secret_key, algorithms=_JWT_ALGORITHMS, options=_JWT_DECODE_OPTIONS)
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None 
     except Exception:
         return None
+    
+    with _decoded_token_lock:
+        _decoded_token_cache[key] = decoded
+    return dict(decoded)
+
+def user_loader(callback):
+    """
+    Register the function that loads a user's serialized dict by id.
+    Used as a decorator; the loader is expected to do its own caching.
+    """
+    global _user_loader
+    _user_loader = callback
+    return callback
+
+def current_user_dict() -> dict | None:
+    """
+    Return the authenticated user's dict for the current request.
+    
+    Loaded through the registered user loader at most once per request and
+    kept on g.current_user_dict. Only valid inside a token_required route.
+    """
+    if 'current_user_dict' not in g:
+        g.current_user_dict = _user_loader(g.current_user_id) if _user_loader else None
+    return g.current_user_dict
 
 def get_current_user_from_token(token: str):
     """Extract user info from JWT token"""
@@ -74,7 +155,6 @@ def token_required(f):
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        token = None
         auth_header = request.headers.get('Authorization')
         
         if not auth_header:
@@ -83,36 +163,29 @@ def token_required(f):
                 'message': 'Token is required'
             }), 401
         
-        try:
-            # Extract token from "Bearer <token>" format
-            if auth_header.startswith('Bearer '):
-                token = auth_header.split(' ')[1]
-            else:
-                return jsonify({
-                    'error': 'Invalid authorization header format',
-                    'message': 'Use Bearer <token> format'
-                }), 401
+        # Extract token from "Bearer <token>" format
+        if len(auth_header) < 8 or not auth_header.startswith('Bearer '):
+            return jsonify({
+                'error': 'Invalid authorization header format',
+                'message': 'Use Bearer <token> format'
+            }), 401
+        token = auth_header[7:]
+        
+        # Decode and validate token; decode_jwt never raises
+        payload = decode_jwt(token)
+        if payload is None:
+            return jsonify({
+                'error': 'Invalid or expired token',
+                'message': 'Please login again'
+            }), 401
             
-            # Decode and validate token
-            payload = decode_jwt(token)
-            if payload is None:
-                return jsonify({
-                    'error': 'Invalid or expired token',
-                    'message': 'Please login again'
-                }), 401
-                
-            current_user_id = payload.get('user_id')
-            if not current_user_id:
-                return jsonify({
-                    'error': 'Invalid token payload',
-                    'message': 'Token does not contain user information'
-                }), 401
-                
-        except Exception as e:
+        current_user_id = payload.get('user_id')
+        if not current_user_id:
             return jsonify({
-                'error': 'Token processing error',
-                'message': 'Invalid token format'
+                'error': 'Invalid token payload',
+                'message': 'Token does not contain user information'
             }), 401
+        g.current_user_id = current_user_id
             
         return f(current_user_id, *args, **kwargs)
     return decorated_function
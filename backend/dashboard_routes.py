@@ -1,6 +1,8 @@
 from flask import Blueprint, jsonify
-from backend.models import User
-from backend.auth_utils import token_required
+from sqlalchemy import func, select
+from backend.models import db, Follow, Post
+from backend.auth_utils import token_required, current_user_dict
+from backend.http_cache import conditional_json
 
 
 dashboard_bp = Blueprint("dashboard", __name__)
@@ -13,30 +15,30 @@ def get_dashboard(current_user_id):
     Returns: JSON response with dashboard data.
     """
     # Fetch the current user
-    user = User.find_by_id(current_user_id)
+    user = current_user_dict()
     if not user:
         return jsonify({
             "error": "User not found",
             "message": "The user account no longer exists."
         }), 404
 
-    # Fetch recent posts from users the current user follows
-    posts = []
-    if hasattr(user, "following"):
-        for followed_user in user.following:
-            recent_posts = (
-                Post.query
-                .filter_by(user_id=followed_user.id)
-                .order_by(Post.created_at.desc())
-                .limit(5)
-                .all()
-            )
-            posts.extend(recent_posts)
+    # Fetch the 5 most recent posts of each followed user in one query,
+    # ranking every author's posts newest first. The followee ids stay a
+    # subquery, so no follow rows or users are loaded.
+    followee_ids = select(Follow.followee_id).where(Follow.follower_id == current_user_id)
+    rn = func.row_number().over(
+        partition_by=Post.user_id,
+        order_by=Post.created_at.desc()
+    ).label("rn")
+    ranked = select(Post.id, rn).where(Post.user_id.in_(followee_ids)).subquery()
+    posts = db.session.scalars(
+        select(Post)
+        .join(ranked, Post.id == ranked.c.id)
+        .where(ranked.c.rn <= 5)
+        .order_by(Post.created_at.desc())
+    ).all()
 
-    # Sort all posts by creation date descending
-    posts.sort(key=lambda p: p.created_at, reverse=True)
-
-    return jsonify({
-        "user": user.to_dict(),
+    return conditional_json({
+        "user": user,
         "feed": [post.to_dict() for post in posts]
-    }), 200
+    })
@@ -1,4 +1,5 @@
-from datetime import datetime, date
+from datetime import date
+from backend.models import db, UTCDateTime, utcnow
 
 class Goal(db.Model):
     """Represents a user's goal."""
@@ -7,10 +8,11 @@ class Goal(db.Model):
     title = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text, nullable=True)
     target_date = db.Column(db.Date, nullable=True)
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at = db.Column(UTCDateTime, default=utcnow)
 
-    # Relationship: one Goal has many Milestones
-    milestones = db.relationship("Milestone", backref="goal", lazy=True)
+    # Relationship: one Goal has many Milestones, loaded for a whole batch of
+    # goals with one extra SELECT ... IN query
+    milestones = db.relationship("Milestone", back_populates="goal", lazy="selectin", passive_deletes=True)
 
     def __repr__(self):
         return f"<Goal {self.id} - {self.title}>"
@@ -30,12 +32,14 @@ class Goal(db.Model):
 class Milestone(db.Model):
     """Represents a milestone belonging to a goal."""
     id = db.Column(db.Integer, primary_key=True)
-    goal_id = db.Column(db.Integer, db.ForeignKey("goal.id"), nullable=False)
+    goal_id = db.Column(db.Integer, db.ForeignKey("goal.id", ondelete="CASCADE"), nullable=False)
     title = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text, nullable=True)
     is_completed = db.Column(db.Boolean, default=False)
     due_date = db.Column(db.Date, nullable=True)
 
+    goal = db.relationship("Goal", back_populates="milestones")
+
     def __repr__(self):
         return f"<Milestone {self.id} - {self.title}>"
 
@@ -57,7 +61,7 @@ class Badge(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
-    awarded_date = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    awarded_date = db.Column(UTCDateTime, default=utcnow)
 
     def __repr__(self):
         return f"<Badge {self.id} - {self.name}>"
@@ -0,0 +1,47 @@
+"""Gunicorn configuration for production.
+
+Run from the repository root:
+    gunicorn -c backend/gunicorn_conf.py backend.wsgi:app
+"""
+
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# gevent workers serve many concurrent requests per process while they wait
+# on the database or Google. bcrypt hashing runs on gevent's threadpool
+# (models.run_blocking) so it does not stall the other greenlets.
+# Set GUNICORN_WORKER_CLASS=gthread to use plain OS threads instead.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gevent')
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))  # gevent
+threads = int(os.getenv('GUNICORN_THREADS', 4))  # gthread
+
+# With RUN_SCHEDULER=1 the master process purges expired password reset
+# tokens every TOKEN_CLEANUP_INTERVAL seconds, so each gunicorn instance runs
+# one cleanup however many workers it has. Each run is a short-lived
+# cleanup-expired-tokens CLI process: the master never imports the app,
+# which workers must import only after gevent has patched them.
+RUN_SCHEDULER = os.getenv('RUN_SCHEDULER') == '1'
+TOKEN_CLEANUP_INTERVAL = int(os.getenv('TOKEN_CLEANUP_INTERVAL', '3600'))
+CLEANUP_COMMAND = [sys.executable, '-m', 'flask', '--app', 'backend.App', 'cleanup-expired-tokens']
+
+def when_ready(server):
+    if not RUN_SCHEDULER:
+        return
+
+    def run():
+        while True:
+            time.sleep(TOKEN_CLEANUP_INTERVAL)
+            result = subprocess.run(CLEANUP_COMMAND, capture_output=True, text=True)
+            if result.returncode:
+                server.log.error("Token cleanup failed: %s", result.stderr.strip())
+            else:
+                server.log.info(result.stdout.strip())
+
+    threading.Thread(target=run, name='token-cleanup', daemon=True).start()
@@ -0,0 +1,41 @@
+"""Conditional GET helpers for JSON endpoints"""
+
+import hashlib
+from flask import current_app, request
+
+def json_etag(body):
+    """ETag value for an encoded JSON body"""
+    return hashlib.blake2b(body.encode(), digest_size=16).hexdigest()
+
+def conditional_json(payload, etag=None, max_age=15):
+    """
+    Build a JSON response with a weak ETag and private Cache-Control, or a
+    bodiless 304 when the client's If-None-Match still matches. Both vary on
+    Authorization, so a browser never serves one user's response to another.
+
+    Args:
+        payload (dict): Data to encode
+        etag (str): Precomputed tag; when given, a 304 skips encoding entirely.
+            Defaults to a digest of the encoded payload.
+        max_age (int): Seconds the client may reuse the response without asking
+
+    Returns:
+        Response: 200 with the JSON body, or 304
+    """
+    body = None
+    if etag is None:
+        body = current_app.json.dumps(payload)
+        etag = json_etag(body)
+
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    elif body is None:
+        response = current_app.json.response(payload)
+    else:
+        response = current_app.response_class(f"{body}\n", mimetype=current_app.json.mimetype)
+
+    response.set_etag(etag, weak=True)
+    response.vary.add('Authorization')
+    response.cache_control.private = True
+    response.cache_control.max_age = max_age
+    return response
@@ -0,0 +1,26 @@
+"""JSON provider that encodes and decodes with orjson"""
+
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Drop-in replacement for Flask's default JSON provider backed by orjson.
+    
+    Keeps the default provider's sorted keys and debug-mode indentation.
+    Output is UTF-8 rather than ASCII-escaped. Datetimes are encoded in C as
+    ISO 8601; naive ones (as SQLite returns them) are marked as UTC.
+    """
+    
+    def dumps(self, obj, **kwargs):
+        """Serialize data as JSON to a string"""
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode()
+    
+    def loads(self, s, **kwargs):
+        """Deserialize data as JSON from a string or bytes"""
+        return orjson.loads(s)
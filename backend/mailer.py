@@ -0,0 +1,70 @@
+"""Background delivery of account emails"""
+
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+from flask import current_app
+import os
+import smtplib
+
+# Emails are sent from this pool so requests return right after their commit.
+# Swapping in a task queue (Celery/RQ) only changes send_async.
+_mail_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='mail')
+
+# SMTP relay for account emails. Without SMTP_HOST nothing is sent; in debug
+# mode the links and tokens are logged instead.
+SMTP_HOST = os.getenv('SMTP_HOST')
+SMTP_PORT = int(os.getenv('SMTP_PORT', '587'))
+SMTP_USERNAME = os.getenv('SMTP_USERNAME')
+SMTP_PASSWORD = os.getenv('SMTP_PASSWORD')
+SMTP_STARTTLS = os.getenv('SMTP_STARTTLS', '1') == '1'
+MAIL_FROM = os.getenv('MAIL_FROM', 'no-reply@localhost')
+
+def send_async(send, *args):
+    """
+    Run an email sender in the background inside the current app's context.
+
+    Args:
+        send (callable): One of the send_* functions below
+        *args: Arguments passed to the sender
+    """
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            try:
+                send(*args)
+            except Exception:
+                current_app.logger.exception("Failed to send email")
+
+    return _mail_executor.submit(run)
+
+def deliver(to, subject, text):
+    """Send a plain-text email through the SMTP relay"""
+    message = EmailMessage()
+    message['From'] = MAIL_FROM
+    message['To'] = to
+    message['Subject'] = subject
+    message.set_content(text)
+
+    with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=10) as smtp:
+        if SMTP_STARTTLS:
+            smtp.starttls()
+        if SMTP_USERNAME:
+            smtp.login(SMTP_USERNAME, SMTP_PASSWORD)
+        smtp.send_message(message)
+
+def send_verification_email(email, token):
+    """Deliver an email verification link"""
+    link = f"http://localhost:3000/verify-email?token={token}"
+    if SMTP_HOST:
+        deliver(email, "Verify your email address", f"Confirm your account by opening this link:\n\n{link}\n")
+    elif current_app.debug:
+        current_app.logger.debug("[DEV] Verify this account: %s", link)
+
+def send_password_reset_email(email, token):
+    """Deliver a password reset token"""
+    if SMTP_HOST:
+        deliver(email, "Reset your password",
+                f"Use this token to reset your password within 10 minutes:\n\n{token}\n")
+    elif current_app.debug:
+        current_app.logger.debug("[DEV] Reset token for %s: %s", email, token)
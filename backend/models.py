@@ -1,15 +1,161 @@
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, g
 from flask_sqlalchemy import SQLAlchemy
-from flask_bcrypt import Bcrypt
+from sqlalchemy import DateTime, delete, event, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import load_only, raiseload
+from sqlalchemy.types import TypeDecorator
 from datetime import datetime, timezone, timedelta
+import base64
+import bcrypt
+import functools
+import hashlib
+import hmac
+import itertools
+import json
+import operator
+import os
 import re
 import secrets
+import sys
 
 
 db = SQLAlchemy()  # connection between python and database
-bcrypt = Bcrypt()  # used to hash and verify passwords
+
+# Default bcrypt cost for new password hashes. Pick the smallest cost that
+# takes about 250ms per hash on the deployment host; App logs the measured
+# time at startup. An app's BCRYPT_LOG_ROUNDS config overrides it.
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', os.getenv('BCRYPT_ROUNDS', '12')))
+
+def hash_password(password, rounds=BCRYPT_ROUNDS):
+    """bcrypt-hash a password, returned as the str stored in password_hash"""
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('ascii')
+
+def verify_password(password_hash, password):
+    """Check a password against a stored bcrypt hash"""
+    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('ascii'))
+
+class UTCDateTime(TypeDecorator):
+    """Timezone-aware UTC datetime column.
+    Aware values are converted to UTC before storage, and values read back
+    are always aware. SQLite drops tzinfo even for DateTime(timezone=True).
+    """
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is not None and value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value
+
+class JSONList(TypeDecorator):
+    """JSON list column, JSONB on PostgreSQL.
+    Rows written while the column was comma-separated text are still read
+    back as lists: a stored string that is not valid JSON is split on commas.
+    """
+    impl = db.JSON
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(postgresql.JSONB())
+        return dialect.type_descriptor(db.JSON())
+
+    def result_processor(self, dialect, coltype):
+        # Replaces the JSON decoder, which raises on legacy text. Drivers
+        # that decode JSON themselves hand back lists, which pass through.
+        def process(value):
+            if not isinstance(value, str):
+                return value
+            try:
+                return json.loads(value)
+            except ValueError:
+                return [e.strip() for e in value.split(',') if e.strip()]
+        return process
+
+def run_blocking(func, *args):
+    """Run a CPU-bound call such as a bcrypt hash.
+    Under gevent it runs on the hub's native threadpool, where bcrypt releases
+    the GIL, so the worker keeps serving other greenlets meanwhile. Otherwise
+    it runs inline: OS-thread workers already hash in parallel.
+    """
+    gevent_monkey = sys.modules.get('gevent.monkey')
+    if gevent_monkey is not None and gevent_monkey.is_module_patched('threading'):
+        from gevent import get_hub
+        return get_hub().threadpool.apply(func, args)
+    return func(*args)
+
+def utcnow():
+    """Current time as an aware UTC datetime; the shared column default"""
+    return datetime.now(timezone.utc)
+
+# Dialect insert constructs that support ON CONFLICT DO NOTHING
+_UPSERT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
 
 # Email validation regex
-EMAIL_REGEX = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+EMAIL_REGEX = re.compile(r'^[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}$')  # matched after lower()
+# Username characters: letters and digits (any script, as str.isalnum),
+# hyphens and underscores
+USERNAME_REGEX = re.compile(r'[\w-]+')
+
+def strict_load_options():
+    """Loader options that make lazy relationship loads raise instead of
+    emitting SQL, when the app sets SQLA_STRICT_LOAD. Routes then have to
+    request relationships explicitly (e.g. selectinload), so N+1 access
+    patterns fail in development and CI instead of shipping.
+    """
+    if current_app.config.get('SQLA_STRICT_LOAD'):
+        return [raiseload('*', sql_only=True)]
+    return []
+
+def strict_select(model):
+    """select() for a model with strict_load_options() applied"""
+    return select(model).options(*strict_load_options())
+
+def request_cached(finder):
+    """Memoize a User finder on flask.g for the rest of the app context.
+    Keys are the finder name, the lowercased value and any other arguments,
+    which must be hashable (pass columns as a tuple), so a partial load is
+    never returned for a full lookup. Misses are not cached, so a user
+    created later in the request is still found.
+    """
+    @functools.wraps(finder)
+    def wrapper(cls, value, *args, **kwargs):
+        cache = g.setdefault('_user_cache', {})
+        key = (finder.__name__, value.lower(), args, frozenset(kwargs.items()))
+        user = cache.get(key)
+        if user is None:
+            user = finder(cls, value, *args, **kwargs)
+            if user is not None:
+                cache[key] = user
+        return user
+    return wrapper
+
+def _drop_user_lookup_cache(*args):
+    """Forget request-cached lookups once an email or username changes"""
+    g.pop('_user_cache', None)
+
+def _hash_token(raw_token):
+    """Return the HMAC-SHA256 of a token under the app secret.
+    Only this digest is stored, so a database leak does not expose live tokens.
+    """
+    secret = current_app.config['SECRET_KEY'].encode()
+    return hmac.new(secret, raw_token.encode(), hashlib.sha256).hexdigest()
+
+def _split_token_owner(raw_token):
+    """Return the id prefix of a "<id>.<random>" token, or None if malformed.
+    Only ASCII digits that fit a 64-bit integer column count as an id.
+    """
+    owner_id, sep, _ = raw_token.partition('.')
+    if not sep or not (owner_id.isascii() and owner_id.isdigit() and len(owner_id) <= 18):
+        return None
+    return int(owner_id)
 
 class User(db.Model):
     """User model with enhanced validation and security"""
@@ -17,17 +163,35 @@ class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)  
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(150), unique=True, nullable=False)
-    password_hash = db.Column(db.String(150), nullable=True)  # Allow null for OAuth users
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    password_hash = db.Column(db.String(60), nullable=True)  # bcrypt hash; null for OAuth users
+    created_at = db.Column(UTCDateTime, default=utcnow)
     is_active = db.Column(db.Boolean, default=True)
     is_verified = db.Column(db.Boolean, default=False)
-    email_verification_token = db.Column(db.String(64), nullable=True)
+    email_verification_token = db.Column(db.String(64), nullable=True)  # HMAC of the emailed token
     oauth_provider = db.Column(db.String(50), nullable=True)  # 'google', 'github', etc.
     oauth_id = db.Column(db.String(100), nullable=True)  # Provider-specific ID
     profile_picture = db.Column(db.String(255), nullable=True)  # Profile picture URL
 
-    def __init__(self, username, email, password=None, oauth_provider=None, oauth_id=None, profile_picture=None):
-        """Initialize user with validation"""
+    __table_args__ = (db.Index('ix_user_oauth', 'oauth_provider', 'oauth_id'),)
+
+    reset_tokens = db.relationship('PasswordResetToken', back_populates='user', passive_deletes=True)
+    # Read-only view of the Follow rows; writes go through Follow itself.
+    # Lazy by default so user lookups stay one query; use selectinload() for lists.
+    following = db.relationship('User', secondary='follow',
+                                primaryjoin='User.id == Follow.follower_id',
+                                secondaryjoin='User.id == Follow.followee_id',
+                                viewonly=True)
+
+    # Columns exposed by to_dict(), in response order
+    _SERIALIZED_FIELDS = ('id', 'username', 'email', 'created_at', 'is_active',
+                          'is_verified', 'oauth_provider', 'profile_picture')
+    # Columns the login path reads: the serialized ones plus the hash
+    LOGIN_COLUMNS = _SERIALIZED_FIELDS + ('password_hash',)
+    # Reads all serialized attributes in one C-level call
+    _serialized_values = operator.attrgetter(*_SERIALIZED_FIELDS)
+
+    def __init__(self, username, email, password=None, oauth_provider=None, oauth_id=None, profile_picture=None, rounds=None):
+        """Initialize user with validation. `rounds` overrides the bcrypt cost."""
         self.username = self.validate_username(username)
         self.email = self.validate_email(email)
         self.oauth_provider = oauth_provider
@@ -35,7 +199,7 @@ class User(db.Model):
         self.profile_picture = profile_picture
         
         if password is not None:
-            self.set_password(password)
+            self.set_password(password, rounds)
         elif oauth_provider is None:
             raise ValueError("Password is required for non-OAuth users")
         
@@ -49,7 +213,7 @@ class User(db.Model):
             raise ValueError("Username must be at least 3 characters long")
         if len(username) > 80:
             raise ValueError("Username must be less than 80 characters")
-        if not username.replace('_', '').replace('-', '').isalnum():
+        if not USERNAME_REGEX.fullmatch(username):
             raise ValueError("Username can only contain letters, numbers, hyphens, and underscores")
         return username.lower()
 
@@ -58,36 +222,57 @@ class User(db.Model):
         """Validate email format"""
         if not email:
             raise ValueError("Email is required")
-        if not EMAIL_REGEX.match(email):
+        # Checked before the regex so its backtracking stays bounded
+        if len(email) > 150:
+            raise ValueError("Email must be less than 150 characters")
+        email = email.lower()
+        if '@' not in email or not EMAIL_REGEX.match(email):
             raise ValueError("Invalid email format")
-        return email.lower()
+        return email
 
-    def set_password(self, password):
-        """Hash and set password with validation"""
+    @staticmethod
+    def validate_password(password):
+        """Validate password strength"""
         if not password:
             raise ValueError("Password is required")
         if len(password) < 6:
             raise ValueError("Password must be at least 6 characters long")
-        self.password_hash = bcrypt.generate_password_hash(password).decode("utf-8")
+        return password
+
+    def set_password(self, password, rounds=None):
+        """Hash and set password with validation. `rounds` overrides the bcrypt cost."""
+        self.validate_password(password)
+        self.password_hash = run_blocking(
+            hash_password, password, rounds or current_app.config.get('BCRYPT_LOG_ROUNDS', BCRYPT_ROUNDS)
+        )
     
     def check_password(self, password):
         """Verify password against hash"""
         if not self.password_hash:
             return False  # OAuth users don't have passwords
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return run_blocking(verify_password, self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        """True if the stored hash was made at a bcrypt cost other than the configured one"""
+        if not self.password_hash:
+            return False
+        rounds = current_app.config.get('BCRYPT_LOG_ROUNDS', BCRYPT_ROUNDS)
+        return not self.password_hash.startswith(f"$2b${rounds:02d}$")
     
     def to_dict(self, include_sensitive=False):
-        """Convert user to dictionary for JSON responses"""
-        user_dict = {
-            'id': self.id,
-            'username': self.username,
-            'email': self.email,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'is_active': self.is_active,
-            'is_verified': self.is_verified,
-            'oauth_provider': self.oauth_provider,
-            'profile_picture': self.profile_picture
-        }
+        """Convert user to dictionary for JSON responses.
+        The public fields are built once per loaded state and reused until an
+        attribute is set, expired or refreshed. created_at stays a datetime;
+        the app's orjson provider encodes it as ISO 8601.
+        """
+        cached = self.__dict__.get('_dict_cache')
+        if cached is None:
+            cached = dict(zip(self._SERIALIZED_FIELDS, self._serialized_values(self)))
+            # Not cached before the first flush: id and created_at are
+            # filled in by the INSERT without firing attribute events
+            if self.id is not None:
+                self.__dict__['_dict_cache'] = cached
+        user_dict = dict(cached)
         
         if include_sensitive:
             # Only include sensitive data when explicitly requested
@@ -96,25 +281,87 @@ class User(db.Model):
         return user_dict
 
     @classmethod
-    def find_by_email(cls, email):
-        """Find user by email"""
-        return cls.query.filter_by(email=email.lower()).first()
+    @request_cached
+    def find_by_email(cls, email, columns=None):
+        """Find user by email. `columns` limits the loaded columns to those names;
+        other attributes are loaded on first access."""
+        stmt = strict_select(cls).where(cls.email == email.lower()).limit(1)
+        if columns:
+            stmt = stmt.options(load_only(*(getattr(cls, name) for name in columns)))
+        return db.session.scalars(stmt).first()
     
     @classmethod
+    @request_cached
     def find_by_username(cls, username):
         """Find user by username"""
-        return cls.query.filter_by(username=username.lower()).first()
+        return db.session.scalars(strict_select(cls).where(cls.username == username.lower()).limit(1)).first()
+    
+    @classmethod
+    def find_conflict(cls, email, username):
+        """Check in a single query whether an email or username is taken.
+        Returns:
+            tuple: (email_taken, username_taken)
+        """
+        email = email.lower()
+        username = username.lower()
+        rows = db.session.execute(
+            select(cls.email, cls.username)
+            .where((cls.email == email) | (cls.username == username))
+            .limit(2)
+        ).all()
+        email_taken = any(row.email == email for row in rows)
+        username_taken = any(row.username == username for row in rows)
+        return email_taken, username_taken
     
     @classmethod
     def find_by_id(cls, user_id):
         """Find user by ID"""
-        return db.session.get(cls, user_id)
+        return db.session.get(cls, user_id, options=strict_load_options())
+
+    @classmethod
+    def find_dict_by_id(cls, user_id):
+        """Load a user's public fields without building an ORM object.
+        Returns:
+            dict or None: Same shape as to_dict(), or None if not found.
+        """
+        row = db.session.execute(
+            select(*(getattr(cls, name) for name in cls._SERIALIZED_FIELDS))
+            .where(cls.id == user_id)
+        ).first()
+        if row is None:
+            return None
+        return row._asdict()
 
     @classmethod
     def find_by_oauth(cls, provider, oauth_id):
         """Find user by OAuth provider and ID"""
-        return cls.query.filter_by(oauth_provider=provider, oauth_id=oauth_id).first()
+        stmt = strict_select(cls).where(cls.oauth_provider == provider, cls.oauth_id == oauth_id).limit(1)
+        return db.session.scalars(stmt).first()
     
+    @classmethod
+    def bulk_create(cls, rows):
+        """Import many password users at once (admin scripts).
+        Every row is validated before anything is hashed, the bcrypt hashes are
+        computed in parallel threads (bcrypt releases the GIL), and the users
+        are written with one bulk insert and a single commit.
+        Args:
+            rows (list[dict]): Keys username, email and password
+        Returns:
+            int: Number of users created.
+        """
+        users = [(cls.validate_username(row['username']), cls.validate_email(row['email']),
+                  cls.validate_password(row['password'])) for row in rows]
+        rounds = current_app.config.get('BCRYPT_LOG_ROUNDS', BCRYPT_ROUNDS)
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            hashes = list(executor.map(hash_password, [password for _, _, password in users],
+                                       itertools.repeat(rounds)))
+        db.session.bulk_insert_mappings(cls, [
+            {'username': username, 'email': email, 'password_hash': password_hash}
+            for (username, email, _), password_hash in zip(users, hashes)
+        ])
+        db.session.commit()
+        return len(users)
+
     @classmethod
     def create_oauth_user(cls, email, name, oauth_provider, oauth_id, profile_picture=None):
         """Create a new OAuth user"""
@@ -130,11 +377,16 @@ class User(db.Model):
         if len(base_username) < 3:
             base_username = f"user_{base_username}"
         
+        # Ensure username is unique: fetch every taken name sharing the prefix
+        # in one query, then pick the first free suffix in memory
+        base_username = base_username.lower()
+        pattern = base_username.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        taken = set(db.session.scalars(
+            select(cls.username).where(cls.username.like(f"{pattern}%", escape='\\'))
+        ))
         username = base_username
-        
-        # Ensure username is unique
         counter = 1
-        while cls.find_by_username(username):
+        while username in taken:
             username = f"{base_username}_{counter}"
             counter += 1
         
@@ -150,9 +402,45 @@ class User(db.Model):
         return f'<User {self.username}>'
     
     def generate_email_verification_token(self):
-        import secrets
-        self.email_verification_token = secrets.token_urlsafe(32)
-        return self.email_verification_token
+        """Create an email verification token of the form "<user_id>.<random>".
+        Only its HMAC is stored. The user must already have an id (flush first).
+        Returns:
+            str: The token to send to the user.
+        """
+        raw_token = f"{self.id}.{secrets.token_urlsafe(32)}"
+        self.email_verification_token = _hash_token(raw_token)
+        return raw_token
+
+    @classmethod
+    def find_by_email_verification_token(cls, token):
+        """Find the user an email verification token was issued to.
+        Looks the user up by the id embedded in the token and compares the
+        stored HMAC in constant time.
+        Returns:
+            User or None: The matching user, or None if the token is invalid.
+        """
+        user_id = _split_token_owner(token)
+        if user_id is None:
+            return None
+        user = db.session.get(cls, user_id)
+        if not user or not user.email_verification_token:
+            return None
+        if not hmac.compare_digest(user.email_verification_token, _hash_token(token)):
+            return None
+        return user
+
+# Invalidate User.to_dict()'s cached fields whenever the loaded state changes
+def _drop_user_dict_cache(target, *args):
+    target.__dict__.pop('_dict_cache', None)
+
+for _name in User._SERIALIZED_FIELDS:
+    event.listen(getattr(User, _name), 'set', _drop_user_dict_cache)
+event.listen(User, 'expire', _drop_user_dict_cache)
+event.listen(User, 'refresh', _drop_user_dict_cache)
+event.listen(User.email, 'set', _drop_user_lookup_cache)
+event.listen(User.username, 'set', _drop_user_lookup_cache)
+event.listen(User, 'after_delete', _drop_user_lookup_cache)
+
 
 class PasswordResetToken(db.Model):
     """Model for resetting password. Stores temporary tokens that allow users to reset their passwords
@@ -161,7 +449,8 @@ class PasswordResetToken(db.Model):
     Attributes:
         id (int): Primary key for the token record
         user_id (int): Foreign key reference to the User model
-        token (str): Secure random token string
+        token (str): HMAC of the "<user_id>.<random>" token sent to the user
+        raw_token (str): The token itself, only set on newly created instances
         created_at (datetime): Timestamp when token was created
         expires_at (datetime): Timestamp when token expires
         used (bool): Shows if token has been used
@@ -169,76 +458,110 @@ class PasswordResetToken(db.Model):
     """
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    token = db.Column(db.String(100), unique=True, nullable=False)
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
-    expires_at = db.Column(db.DateTime, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    token = db.Column(db.String(64), unique=True, nullable=False)  # hex HMAC-SHA256
+    created_at = db.Column(UTCDateTime, default=utcnow)
+    expires_at = db.Column(UTCDateTime, nullable=False)
     used = db.Column(db.Boolean, default=False)
     
-    # Relationship to User model with backref for easy access
-    user = db.relationship('User', backref='reset_tokens')
+    # Relationship to User model; User.reset_tokens is the other side
+    user = db.relationship('User', back_populates='reset_tokens')
+
+    # Serves the per-user unused token lookup and delete, and "valid tokens
+    # for user X". Partial, so used tokens never enter the index; the queries
+    # compare `used` to a literal false, which lets both databases match it.
+    __table_args__ = (
+        db.Index('ix_prt_active', 'user_id', 'expires_at',
+                 postgresql_where=db.text('used = false'), sqlite_where=db.text('used = 0')),
+        # Serves cleanup_expired's range delete, which ignores `used`
+        db.Index('ix_prt_expires_at', 'expires_at'),
+    )
     
-    def __init__(self, user_id):
+    def __init__(self, user_id, entropy=None):
         """Initialize a new password reset token.
         Creates a secure token with 10-minute expiration time.
         Args:
             user_id (int): ID of the user requesting password reset
+            entropy (bytes): 32 random bytes to use; drawn fresh if omitted
         """
         self.user_id = user_id
-        # Generate secure URL-safe token (32 bytes = 43 chars)
-        self.token = secrets.token_urlsafe(32)
+        # Generate secure URL-safe token (32 bytes = 43 chars) prefixed with the
+        # owner's id; only its HMAC is persisted
+        random_part = base64.urlsafe_b64encode(entropy or secrets.token_bytes(32)).rstrip(b'=').decode()
+        self.raw_token = f"{user_id}.{random_part}"
+        self.token = _hash_token(self.raw_token)
         # Token expeires 10 mins from generation
-        self.expires_at = datetime.now(timezone.utc) + timedelta(minutes=10)
+        self.expires_at = utcnow() + timedelta(minutes=10)
         self.used = False
     
+    @classmethod
+    def bulk_issue(cls, user_ids):
+        """Create reset tokens for many users (admin resets) and add them to the
+        session. All randomness comes from a single os.urandom call. The caller
+        commits.
+        Args:
+            user_ids (list[int]): Users to issue tokens for
+        Returns:
+            list[PasswordResetToken]: The new tokens, with raw_token set.
+        """
+        entropy = os.urandom(32 * len(user_ids))
+        tokens = [cls(user_id, entropy[i * 32:(i + 1) * 32]) for i, user_id in enumerate(user_ids)]
+        db.session.add_all(tokens)
+        return tokens
+
     def is_valid(self):
         """Check if the token is valid for use.
         Valid if token hasn't been used and hasn't expired.
         Returns:
             bool: True if token is valid, False otherwise.
         """
-        # Ensure both datetimes are timezone-aware for comparison
-        current_time = datetime.now(timezone.utc)
-        expires_time = self.expires_at.replace(tzinfo=timezone.utc) if self.expires_at.tzinfo is None else self.expires_at
-        return not self.used and current_time < expires_time
+        return not self.used and utcnow() < self.expires_at
     
     def mark_as_used(self):
-        """Mark  token as used to prevent reuse.
-        Commits the change to the database immediately
-        to ensure the token cannot be used again.
+        """Mark token as used to prevent reuse.
+        The caller commits, so the token is consumed in the same transaction
+        as the password change it authorizes.
         """
         self.used = True
-        db.session.commit()
     
     @classmethod
     def find_by_token(cls, token):
-        """Find a password reset token by its token string.
+        """Find an unused password reset token by its token string.
+        Only the owner's unused tokens are loaded, and the HMACs are compared
+        in constant time.
         Args:
-            token (str): The token string to search for.
+            token (str): The token string sent to the user.
         Returns:
             PasswordResetToken or None: The token object if found, None otherwise.
         """
-        return cls.query.filter_by(token=token).first()
+        user_id = _split_token_owner(token)
+        if user_id is None:
+            return None
+        token_hash = _hash_token(token)
+        for reset_token in db.session.scalars(select(cls).filter_by(user_id=user_id, used=False)):
+            if hmac.compare_digest(reset_token.token, token_hash):
+                return reset_token
+        return None
     
     @classmethod
-    def cleanup_expired(cls):
+    def cleanup_expired(cls, batch_size=1000):
         """Method to remove all expired tokens from the database.
+        Deletes at most `batch_size` rows per transaction, so a large backlog
+        never holds locks or grows the WAL in one long statement.
         Returns:
             int: Number of expired tokens that were deleted.
         """
-        # Find all expired tokens - handle timezone comparison
-        current_time = datetime.now(timezone.utc)
-        expired_tokens = cls.query.all()
-        expired_tokens = [token for token in expired_tokens 
-                         if (token.expires_at.replace(tzinfo=timezone.utc) if token.expires_at.tzinfo is None else token.expires_at) < current_time]
-        
-        # Delete each expired token
-        for token in expired_tokens:
-            db.session.delete(token)
-        
-        # Commit the deletions, return number of expired tokens
-        db.session.commit()
-        return len(expired_tokens)
+        now = utcnow()
+        expired_ids = select(cls.id).where(cls.expires_at < now).limit(batch_size)
+        stmt = (delete(cls).where(cls.id.in_(expired_ids))
+                .execution_options(synchronize_session=False))
+        deleted = 0
+        while True:
+            batch = db.session.execute(stmt).rowcount
+            db.session.commit()
+            deleted += batch
+            if batch < batch_size:
+                return deleted
 
 
 class Profile(db.Model):
@@ -249,7 +572,7 @@ class Profile(db.Model):
     bio = db.Column(db.Text, nullable=True)
     profile_picture_url = db.Column(db.String(300), nullable=True)
     cover_photo_url = db.Column(db.String(300), nullable=True)
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at = db.Column(UTCDateTime, default=utcnow)
 
 
 
@@ -262,7 +585,7 @@ class Profile(db.Model):
             'bio': self.bio,
             'profile_picture_url': self.profile_picture_url,
             'cover_photo_url': self.cover_photo_url,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at
         }
     
     
@@ -271,30 +594,120 @@ class Profile(db.Model):
 
 class Follow(db.Model):
     """Model representing a follow relationship between users."""
+    __tablename__ = 'follow'
     id = db.Column(db.Integer, primary_key=True)
     follower_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     followee_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at = db.Column(UTCDateTime, default=utcnow)
 
     __table_args__ = (db.UniqueConstraint('follower_id', 'followee_id', name='unique_follow'),)
 
+    @classmethod
+    def create_if_absent(cls, follower_id, followee_id):
+        """Insert a follow unless the pair already exists, in one statement.
+        Uses INSERT ... ON CONFLICT DO NOTHING on SQLite and PostgreSQL so
+        concurrent requests cannot race between a check and the insert.
+        Returns:
+            bool: True if a new follow was created.
+        """
+        dialect = db.session.get_bind().dialect.name
+        if dialect not in _UPSERT_INSERTS:
+            try:
+                with db.session.begin_nested():
+                    db.session.add(cls(follower_id=follower_id, followee_id=followee_id))
+                return True
+            except IntegrityError:
+                return False
+
+        stmt = (_UPSERT_INSERTS[dialect](cls)
+                .values(follower_id=follower_id, followee_id=followee_id)
+                .on_conflict_do_nothing(index_elements=['follower_id', 'followee_id'])
+                .returning(cls.id))
+        return db.session.execute(stmt).scalar() is not None
+
+    @classmethod
+    def bulk_create(cls, pairs, batch_size=500):
+        """Insert many follows, skipping pairs that already exist.
+        Each batch is one multi-row INSERT ... ON CONFLICT DO NOTHING and is
+        committed on its own, so seeding a large graph never builds ORM objects.
+        Args:
+            pairs (list[tuple[int, int]]): (follower_id, followee_id) pairs
+            batch_size (int): Rows per INSERT statement
+        Returns:
+            int: Number of follows created.
+        """
+        dialect = db.session.get_bind().dialect.name
+        created = 0
+        for start in range(0, len(pairs), batch_size):
+            batch = pairs[start:start + batch_size]
+            if dialect in _UPSERT_INSERTS:
+                stmt = (_UPSERT_INSERTS[dialect](cls)
+                        .values([{'follower_id': follower_id, 'followee_id': followee_id}
+                                 for follower_id, followee_id in batch])
+                        .on_conflict_do_nothing(index_elements=['follower_id', 'followee_id']))
+                created += db.session.execute(stmt).rowcount
+            else:
+                created += sum(cls.create_if_absent(*pair) for pair in batch)
+            db.session.commit()
+        return created
+
     def __repr__(self):
         return f"<Follow follower={self.follower_id} followee={self.followee_id}>"
 
+class Post(db.Model):
+    """Model representing a post shown in followers' dashboard feeds."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    created_at = db.Column(UTCDateTime, default=utcnow)
+
+    def to_dict(self):
+        """Convert post to dictionary for JSON responses"""
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'content': self.content,
+            'created_at': self.created_at
+        }
+
+    def __repr__(self):
+        return f"<Post {self.id} by User {self.user_id}>"
+
+# Serves the per-author "latest posts" window in the dashboard feed
+db.Index('ix_post_user_created', Post.user_id, Post.created_at.desc())
+
 class WaitlistEntry(db.Model):
     __tablename__ = 'waitlist_entries'
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
     email = db.Column(db.String(120), nullable=False)
     referred_by = db.Column(db.String(120))
-    referred_emails = db.Column(db.Text)  # Store as comma-separated string
+    # JSON list (JSONB on PostgreSQL, GIN-indexed below for referral lookups).
+    # Older rows may still hold comma-separated text; JSONList reads both.
+    referred_emails = db.Column(JSONList(), nullable=False, server_default='[]')
 
     def __init__(self, name, email, referred_by, referred_emails):
         self.name = name
         self.email = email
         self.referred_by = referred_by
-        # Store emails as comma-separated string
-        self.referred_emails = ','.join([e for e in referred_emails if e.strip()])
+        self.referred_emails = [e for e in referred_emails if e.strip()]
+
+    @classmethod
+    def bulk_create(cls, entries, batch_size=500):
+        """Insert many waitlist entries with bulk mappings, committing per batch.
+        Args:
+            entries (list[dict]): Keys name, email, referred_by and
+                referred_emails (a list, stored like __init__ does)
+            batch_size (int): Rows per flush
+        Returns:
+            int: Number of entries inserted.
+        """
+        rows = [{**entry, 'referred_emails': [e for e in entry.get('referred_emails') or [] if e.strip()]}
+                for entry in entries]
+        for start in range(0, len(rows), batch_size):
+            db.session.bulk_insert_mappings(cls, rows[start:start + batch_size])
+            db.session.commit()
+        return len(rows)
 
     def to_dict(self):
         return {
@@ -302,5 +715,8 @@ class WaitlistEntry(db.Model):
             "name": self.name,
             "email": self.email,
             "referred_by": self.referred_by,
-            "referred_emails": self.referred_emails.split(',') if self.referred_emails else [],
-        }
\ No newline at end of file
+            "referred_emails": self.referred_emails or [],
+        }
+
+db.Index('ix_waitlist_referred_emails', WaitlistEntry.referred_emails,
+         postgresql_using='gin').ddl_if(dialect='postgresql')
@@ -1,13 +1,62 @@
 """OAuth utility functions for Google authentication"""
 
 import os
+import re
 import requests
 import secrets
+import threading
+import time
 from urllib.parse import urlencode
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cachetools import TLRUCache
 from google.auth.transport import requests as google_requests
 from google.oauth2 import id_token
 import json
 
+# One pooled session for every call to Google, so the token exchange and the
+# userinfo lookup (and later callbacks) reuse kept-alive TLS connections.
+# Retry only covers connection failures; urllib3 does not resend a POST that
+# reached the server, so an authorization code is never submitted twice.
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=32,
+                                       max_retries=Retry(total=2, backoff_factor=0.1)))
+HTTP_TIMEOUT = (3.05, 5)  # (connect, read) seconds
+
+# Google's ID token signing certificates
+_CERTS_URLS = frozenset({
+    'https://www.googleapis.com/oauth2/v1/certs',
+    'https://www.googleapis.com/oauth2/v3/certs',
+})
+_MAX_AGE_REGEX = re.compile(r'max-age=(\d+)')
+
+class CachedCertsRequest(google_requests.Request):
+    """google-auth transport that keeps Google's signing certificates in memory
+    for their Cache-Control max-age (an hour if absent), so verifying an ID
+    token is a local signature check rather than an HTTPS fetch"""
+
+    def __init__(self, session=None):
+        super().__init__(session=session)
+        # url -> (response, seconds to keep it)
+        self._certs = TLRUCache(maxsize=len(_CERTS_URLS), ttu=lambda _url, entry, now: now + entry[1],
+                                timer=time.monotonic)
+        self._lock = threading.Lock()
+
+    def __call__(self, url, method='GET', **kwargs):
+        if method != 'GET' or url not in _CERTS_URLS:
+            return super().__call__(url, method=method, **kwargs)
+        with self._lock:
+            entry = self._certs.get(url)
+        if entry is None:
+            response = super().__call__(url, method=method, **kwargs)
+            if response.status != 200:
+                return response
+            match = _MAX_AGE_REGEX.search(response.headers.get('Cache-Control', ''))
+            entry = (response, int(match.group(1)) if match else 3600)
+            with self._lock:
+                self._certs[url] = entry
+        return entry[0]
+
 class GoogleOAuth:
     """Google OAuth handler using simple HTTP requests"""
     
@@ -16,6 +65,9 @@ class GoogleOAuth:
         self.client_secret = os.getenv('GOOGLE_CLIENT_SECRET')
         self.redirect_uri = os.getenv('GOOGLE_REDIRECT_URI', 'http://localhost:5000/api/auth/google/callback')
         
+        # Transport for id_token verification, sharing the pooled session
+        self.google_request = CachedCertsRequest(session=_session)
+        
         if not self.client_id or not self.client_secret:
             print("Warning: Google OAuth credentials not configured")
     
@@ -59,7 +111,7 @@ class GoogleOAuth:
                 'redirect_uri': self.redirect_uri
             }
             
-            token_response = requests.post(token_url, data=token_data)
+            token_response = _session.post(token_url, data=token_data, timeout=HTTP_TIMEOUT)
             token_json = token_response.json()
             
             if token_response.status_code != 200 or 'access_token' not in token_json:
@@ -69,7 +121,7 @@ class GoogleOAuth:
             # Step 2: Get user info using access token
             user_info_url = 'https://www.googleapis.com/oauth2/v2/userinfo'
             headers = {'Authorization': f"Bearer {token_json['access_token']}"}
-            user_response = requests.get(user_info_url, headers=headers)
+            user_response = _session.get(user_info_url, headers=headers, timeout=HTTP_TIMEOUT)
             
             if user_response.status_code != 200:
                 raise Exception("Failed to get user information from Google")
@@ -100,8 +152,7 @@ class GoogleOAuth:
             if not self.client_id:
                 raise ValueError("Google OAuth client ID not configured")
                 
-            request = google_requests.Request()
-            id_info = id_token.verify_oauth2_token(token, request, self.client_id)
+            id_info = id_token.verify_oauth2_token(token, self.google_request, self.client_id)
             
             # Check if the token is for our application
             if id_info['aud'] != self.client_id:
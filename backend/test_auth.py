@@ -1,38 +1,74 @@
 import unittest
+from unittest import mock
+import logging
 import os
+import sys
 import tempfile
+import threading
 from datetime import datetime, timedelta, timezone
-from flask import Flask
-from models import db, User
-from auth_utils import generate_jwt, decode_jwt, token_required, JWTManager
+from flask import Flask, g
+
+# Import the app's modules as the backend package, the same way App.py and
+# the WSGI entrypoint do, so the suite and the app share one copy of each
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend import auth_utils, mailer, models
+from backend.models import db, User, PasswordResetToken, Follow, Post, WaitlistEntry
+from backend.json_provider import OrjsonProvider
+from backend.auth_utils import generate_jwt, decode_jwt, token_required, user_loader, current_user_dict, JWTManager
 import jwt
+import sqlalchemy
+from sqlalchemy.exc import InvalidRequestError
 
-class TestJWTAuth(unittest.TestCase):
-    """Test JWT authentication utilities"""
+class AppTestCase(unittest.TestCase):
+    """Shares one app and in-memory database per test class; each test gets
+    its own app context, and rows and config changes are undone after it"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Create the app and schema once per class"""
+        cls.app = Flask(__name__)
+        cls.app.config['SECRET_KEY'] = 'test-secret-key'
+        cls.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        cls.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        cls.app.config['TESTING'] = True
+        # Minimum bcrypt cost: same code paths, ~256x less work than 12
+        cls.app.config['BCRYPT_LOG_ROUNDS'] = 4
+        
+        db.init_app(cls.app)
+        
+        with cls.app.app_context():
+            db.create_all()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Drop the schema and close the class's database"""
+        with cls.app.app_context():
+            db.drop_all()
+            db.engine.dispose()
 
     def setUp(self):
         """Set up test fixtures"""
-        self.app = Flask(__name__)
-        self.app.config['SECRET_KEY'] = 'test-secret-key'
-        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-        self.app.config['TESTING'] = True
-        
-        db.init_app(self.app)
-        
-        with self.app.app_context():
-            db.create_all()
-            
+        self.config = dict(self.app.config)
         self.app_context = self.app.app_context()
         self.app_context.push()
-        
-        self.client = self.app.test_client()
 
     def tearDown(self):
         """Clean up after tests"""
         db.session.remove()
-        db.drop_all()
+        with db.engine.begin() as connection:
+            for table in reversed(db.metadata.sorted_tables):
+                connection.execute(table.delete())
         self.app_context.pop()
+        self.app.config.clear()
+        self.app.config.update(self.config)
+
+class TestJWTAuth(AppTestCase):
+    """Test JWT authentication utilities"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        super().setUp()
+        self.client = self.app.test_client()
 
     def test_generate_jwt_valid_payload(self):
         """Test JWT generation with valid payload"""
@@ -90,6 +126,8 @@ class TestJWTAuth(unittest.TestCase):
             'invalid.token.here',
             'eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.invalid.payload',
             'completely-invalid-token',
+            'eyJhbGciOiJIUzI1NiJ9.e30.sig nature',
+            'a.b.c',
             '',
             None
         ]
@@ -110,6 +148,31 @@ class TestJWTAuth(unittest.TestCase):
         decoded = decode_jwt(tampered_token)
         self.assertIsNone(decoded)
 
+    def test_decode_jwt(self):
+        """Test decoding reuses recent valid payloads and rejects invalid tokens"""
+        token = generate_jwt({'user_id': 7})
+        
+        first = decode_jwt(token)
+        second = decode_jwt(token)
+        self.assertIsNotNone(first)
+        self.assertEqual(second['user_id'], 7)
+        self.assertEqual(first, second)
+        # Changes to a returned payload do not leak into later decodes
+        first['user_id'] = 8
+        self.assertEqual(decode_jwt(token)['user_id'], 7)
+        
+        expired_token = generate_jwt({'user_id': 7}, expires_in_minutes=-1)
+        self.assertIsNone(decode_jwt(expired_token))
+        self.assertIsNone(decode_jwt(token[:-5] + 'xxxxx'))
+        self.assertIsNone(decode_jwt(jwt.encode({'user_id': 7}, JWTManager.get_secret_key(), algorithm='HS256')))
+        
+        # A cached payload is not served once the signing secret changes
+        os.environ['JWT_SECRET_KEY'] = 'rotated-secret'
+        try:
+            self.assertIsNone(decode_jwt(token))
+        finally:
+            del os.environ['JWT_SECRET_KEY']
+
     def test_jwt_manager_secret_key(self):
         """Test JWT manager secret key retrieval"""
         # Test with environment variable
@@ -123,6 +186,10 @@ class TestJWTAuth(unittest.TestCase):
         # Test fallback to Flask config
         secret = JWTManager.get_secret_key()
         self.assertEqual(secret, 'test-secret-key')
+        
+        # Each app's current config is used, not the first one seen
+        self.app.config['SECRET_KEY'] = 'other-secret-key'
+        self.assertEqual(JWTManager.get_secret_key(), 'other-secret-key')
 
     def test_token_required_decorator_valid_token(self):
         """Test token_required decorator with valid token"""
@@ -140,6 +207,34 @@ class TestJWTAuth(unittest.TestCase):
             result = protected_route()
             self.assertEqual(result['user_id'], 123)
 
+    def test_current_user_dict(self):
+        """Test the authenticated user is loaded once per request"""
+        calls = []
+        previous_loader = auth_utils._user_loader
+        
+        @user_loader
+        def load_user(user_id):
+            calls.append(user_id)
+            return {'id': user_id}
+        
+        @token_required
+        def protected_route(current_user_id):
+            return current_user_dict(), current_user_dict()
+        
+        token = generate_jwt({'user_id': 123})
+        try:
+            with self.app.test_request_context(
+                '/protected',
+                headers={'Authorization': f'Bearer {token}'}
+            ):
+                first, second = protected_route()
+        finally:
+            user_loader(previous_loader)
+        
+        self.assertEqual(first, {'id': 123})
+        self.assertIs(first, second)
+        self.assertEqual(calls, [123])
+
     def test_token_required_decorator_missing_token(self):
         """Test token_required decorator with missing token"""
         @token_required
@@ -157,13 +252,14 @@ class TestJWTAuth(unittest.TestCase):
         def protected_route(current_user_id):
             return {'user_id': current_user_id}
         
-        with self.app.test_request_context(
-            '/protected',
-            headers={'Authorization': 'InvalidFormat token'}
-        ):
-            result = protected_route()
-            self.assertIsInstance(result, tuple)
-            self.assertEqual(result[1], 401)  # Status code
+        for header in ['InvalidFormat token', 'Bearer ', 'Bearer']:
+            with self.app.test_request_context(
+                '/protected',
+                headers={'Authorization': header}
+            ):
+                result = protected_route()
+                self.assertIsInstance(result, tuple)
+                self.assertEqual(result[1], 401)  # Status code
 
     def test_token_required_decorator_expired_token(self):
         """Test token_required decorator with expired token"""
@@ -182,31 +278,9 @@ class TestJWTAuth(unittest.TestCase):
             self.assertIsInstance(result, tuple)
             self.assertEqual(result[1], 401)  # Status code
 
-class TestUserModel(unittest.TestCase):
+class TestUserModel(AppTestCase):
     """Test User model functionality"""
 
-    def setUp(self):
-        """Set up test fixtures"""
-        self.app = Flask(__name__)
-        self.app.config['SECRET_KEY'] = 'test-secret-key'
-        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-        self.app.config['TESTING'] = True
-        
-        db.init_app(self.app)
-        
-        with self.app.app_context():
-            db.create_all()
-            
-        self.app_context = self.app.app_context()
-        self.app_context.push()
-
-    def tearDown(self):
-        """Clean up after tests"""
-        db.session.remove()
-        db.drop_all()
-        self.app_context.pop()
-
     def test_user_creation_valid(self):
         """Test creating user with valid data"""
         user = User(
@@ -235,6 +309,9 @@ class TestUserModel(unittest.TestCase):
         
         with self.assertRaises(ValueError):
             User(username='testuser', email='', password='password123')
+        
+        with self.assertRaises(ValueError):
+            User(username='testuser', email='a@' + 'b.' * 80 + 'com', password='password123')
 
     def test_user_creation_invalid_password(self):
         """Test creating user with invalid password"""
@@ -261,6 +338,35 @@ class TestUserModel(unittest.TestCase):
         # Should reject incorrect password
         self.assertFalse(user.check_password('wrongpassword'))
 
+    def test_password_needs_rehash(self):
+        """Test hashes made at another bcrypt cost are flagged for rehashing"""
+        self.app.config['BCRYPT_LOG_ROUNDS'] = 5
+        user = User(username='rehash', email='rehash@example.com', password='password123')
+        self.assertFalse(user.password_needs_rehash())
+        
+        self.app.config['BCRYPT_LOG_ROUNDS'] = 4
+        self.assertTrue(user.password_needs_rehash())
+        user.set_password('password123')
+        self.assertFalse(user.password_needs_rehash())
+        self.assertTrue(user.check_password('password123'))
+
+    def test_user_bulk_create(self):
+        """Test bulk-imported users are validated, hashed and usable"""
+        rows = [{'username': f'Bulk{i}', 'email': f'Bulk{i}@example.com', 'password': f'password{i}'}
+                for i in range(3)]
+        self.assertEqual(User.bulk_create(rows), 3)
+        
+        user = User.find_by_email('bulk1@example.com')
+        self.assertEqual(user.username, 'bulk1')
+        self.assertTrue(user.check_password('password1'))
+        self.assertTrue(user.is_active)
+        self.assertFalse(user.is_verified)
+        self.assertIsNotNone(user.created_at)
+        
+        with self.assertRaises(ValueError):
+            User.bulk_create([{'username': 'okname', 'email': 'ok@example.com', 'password': 'pw'}])
+        self.assertIsNone(User.find_by_username('okname'))
+
     def test_user_find_methods(self):
         """Test user finding methods"""
         user = User(
@@ -285,6 +391,214 @@ class TestUserModel(unittest.TestCase):
         found_user = User.find_by_id(user.id)
         self.assertIsNotNone(found_user)
         self.assertEqual(found_user.username, 'findme')
+        
+        # Find serialized fields by ID
+        self.assertEqual(User.find_dict_by_id(user.id), user.to_dict())
+        self.assertIsNone(User.find_dict_by_id(user.id + 1))
+
+    def test_user_find_conflict(self):
+        """Test combined email/username availability check"""
+        user = User(
+            username='taken',
+            email='taken@example.com',
+            password='password123'
+        )
+        db.session.add(user)
+        db.session.commit()
+        
+        self.assertEqual(User.find_conflict('Taken@example.com', 'free'), (True, False))
+        self.assertEqual(User.find_conflict('free@example.com', 'TAKEN'), (False, True))
+        self.assertEqual(User.find_conflict('taken@example.com', 'taken'), (True, True))
+        self.assertEqual(User.find_conflict('free@example.com', 'free'), (False, False))
+
+    def test_create_oauth_user_unique_username(self):
+        """Test OAuth usernames take the first free numeric suffix"""
+        for username in ('jane_doe', 'jane_doe_1', 'janexdoe_2'):
+            db.session.add(User(username=username, email=f'{username}@example.com', password='password123'))
+        db.session.commit()
+        
+        user = User.create_oauth_user('jane@example.com', 'Jane Doe', 'google', '1')
+        self.assertEqual(user.username, 'jane_doe_2')
+        user = User.create_oauth_user('new@example.com', 'New Person', 'google', '2')
+        self.assertEqual(user.username, 'new_person')
+
+    def test_email_verification_token(self):
+        """Test verification tokens resolve to their user and are stored hashed"""
+        user = User(
+            username='verifyme',
+            email='verify@example.com',
+            password='password123'
+        )
+        db.session.add(user)
+        db.session.flush()
+        token = user.generate_email_verification_token()
+        db.session.commit()
+        
+        self.assertTrue(token.startswith(f'{user.id}.'))
+        self.assertNotEqual(user.email_verification_token, token)
+        self.assertEqual(User.find_by_email_verification_token(token), user)
+        
+        for invalid_token in [token + 'x', 'no-dot-token', f'{user.id + 1}.abc', '']:
+            self.assertIsNone(User.find_by_email_verification_token(invalid_token))
+
+    def test_password_reset_token_lookup(self):
+        """Test reset tokens are found by their raw value only"""
+        user = User(
+            username='resetme',
+            email='reset@example.com',
+            password='password123'
+        )
+        db.session.add(user)
+        db.session.commit()
+        reset_token = PasswordResetToken(user_id=user.id)
+        db.session.add(reset_token)
+        db.session.commit()
+        
+        self.assertEqual(PasswordResetToken.find_by_token(reset_token.raw_token), reset_token)
+        self.assertIsNone(PasswordResetToken.find_by_token(reset_token.token))
+        self.assertIsNone(PasswordResetToken.find_by_token(reset_token.raw_token[:-1]))
+        self.assertTrue(reset_token.is_valid())
+
+    def test_password_reset_token_bulk_issue(self):
+        """Test bulk-issued reset tokens are distinct and resolvable"""
+        tokens = PasswordResetToken.bulk_issue([1, 2, 3])
+        db.session.commit()
+        
+        self.assertEqual(len({t.raw_token for t in tokens}), 3)
+        for user_id, token in zip([1, 2, 3], tokens):
+            self.assertTrue(token.raw_token.startswith(f"{user_id}."))
+            self.assertEqual(len(token.raw_token.partition('.')[2]), 43)
+            self.assertEqual(PasswordResetToken.find_by_token(token.raw_token), token)
+
+    def test_follow_create_if_absent(self):
+        """Test follows are inserted once per pair"""
+        self.assertTrue(Follow.create_if_absent(1, 2))
+        self.assertFalse(Follow.create_if_absent(1, 2))
+        self.assertTrue(Follow.create_if_absent(2, 1))
+        db.session.commit()
+        
+        follows = Follow.query.order_by(Follow.id).all()
+        self.assertEqual([(f.follower_id, f.followee_id) for f in follows], [(1, 2), (2, 1)])
+        self.assertIsNotNone(follows[0].created_at)
+
+    def test_user_following(self):
+        """Test User.following reads through the Follow rows"""
+        users = [User(username=f'user{i}', email=f'user{i}@example.com', password='password123')
+                 for i in range(3)]
+        db.session.add_all(users)
+        db.session.commit()
+        Follow.bulk_create([(users[0].id, users[1].id), (users[0].id, users[2].id)])
+        
+        self.assertEqual({u.username for u in users[0].following}, {'user1', 'user2'})
+        self.assertEqual(users[1].following, [])
+
+    def test_bulk_create(self):
+        """Test bulk inserts batch rows and skip existing follows"""
+        Follow.create_if_absent(1, 2)
+        db.session.commit()
+        
+        self.assertEqual(Follow.bulk_create([(1, 2), (1, 3), (2, 3), (3, 1)], batch_size=3), 3)
+        self.assertEqual(Follow.query.count(), 4)
+        self.assertTrue(all(f.created_at for f in Follow.query))
+        
+        entries = [{'name': f'Person {i}', 'email': f'p{i}@example.com', 'referred_by': '',
+                    'referred_emails': ['a@example.com', ' ']} for i in range(3)]
+        self.assertEqual(WaitlistEntry.bulk_create(entries, batch_size=2), 3)
+        self.assertEqual([e.to_dict()['referred_emails'] for e in WaitlistEntry.query],
+                         [['a@example.com']] * 3)
+
+    def test_waitlist_legacy_referred_emails(self):
+        """Comma-separated referral text from before the JSON column reads back as a list"""
+        db.session.execute(WaitlistEntry.__table__.insert().values(
+            name='Legacy', email='legacy@example.com', referred_by='',
+            referred_emails=sqlalchemy.literal_column("'a@example.com, b@example.com'")))
+        db.session.add(WaitlistEntry('New', 'new@example.com', '', ['c@example.com']))
+        db.session.commit()
+        db.session.expunge_all()
+        self.assertEqual([e.to_dict()['referred_emails'] for e in WaitlistEntry.query.order_by(WaitlistEntry.id)],
+                         [['a@example.com', 'b@example.com'], ['c@example.com']])
+
+    def test_password_reset_token_lookup_uses_active_index(self):
+        """Test the unused-token lookup is served by the partial ix_prt_active index"""
+        stmt = sqlalchemy.select(PasswordResetToken).filter_by(user_id=1, used=False)
+        compiled = stmt.compile(dialect=db.engine.dialect)
+        plan = db.session.connection().exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {compiled}", tuple(compiled.params[name] for name in compiled.positiontup)
+        ).fetchall()
+        self.assertIn('USING INDEX ix_prt_active', plan[0][-1])
+
+    def test_password_reset_token_cleanup_expired(self):
+        """Test cleanup deletes only expired reset tokens"""
+        expired = PasswordResetToken(user_id=1)
+        expired.expires_at = datetime.now(timezone.utc) - timedelta(minutes=1)
+        live = PasswordResetToken(user_id=1)
+        db.session.add_all([expired, live])
+        db.session.commit()
+        live_id = live.id
+        
+        self.assertEqual(PasswordResetToken.cleanup_expired(), 1)
+        self.assertEqual([t.id for t in PasswordResetToken.query.all()], [live_id])
+        
+        for token in PasswordResetToken.bulk_issue([2] * 5):
+            token.expires_at = datetime.now(timezone.utc) - timedelta(minutes=1)
+        db.session.commit()
+        self.assertEqual(PasswordResetToken.cleanup_expired(batch_size=2), 5)
+        self.assertEqual([t.id for t in PasswordResetToken.query.all()], [live_id])
+        
+        # Timestamps read back from SQLite are timezone-aware UTC
+        db.session.expire_all()
+        reloaded = PasswordResetToken.query.one()
+        self.assertEqual(reloaded.expires_at.tzinfo, timezone.utc)
+        self.assertTrue(reloaded.is_valid())
+
+    def test_strict_load(self):
+        """Test SQLA_STRICT_LOAD turns lazy relationship loads into errors"""
+        user = User(username='strict', email='strict@example.com', password='password123')
+        db.session.add(user)
+        db.session.commit()
+        db.session.expire_all()
+        self.assertEqual(User.find_by_email('strict@example.com').reset_tokens, [])
+        
+        self.app.config['SQLA_STRICT_LOAD'] = True
+        with self.app.app_context(), self.assertRaises(InvalidRequestError):
+            User.find_by_email('strict@example.com').reset_tokens
+
+    def test_user_lookup_request_cache(self):
+        """Test finders reuse lookups within an app context until the key changes"""
+        user = User(username='cached', email='cached@example.com', password='password123')
+        db.session.add(user)
+        db.session.commit()
+        
+        self.assertIs(User.find_by_email('Cached@example.com'), user)
+        self.assertIs(User.find_by_username('cached'), user)
+        self.assertIn(('find_by_email', 'cached@example.com', (), frozenset()), g._user_cache)
+        
+        user.email = 'moved@example.com'
+        db.session.commit()
+        self.assertIsNone(User.find_by_email('cached@example.com'))
+        self.assertIs(User.find_by_email('moved@example.com'), user)
+        
+        # A column-limited login lookup is cached apart from full lookups
+        with self.app.app_context():
+            partial = User.find_by_email('moved@example.com', columns=User.LOGIN_COLUMNS)
+            self.assertIn('oauth_id', sqlalchemy.inspect(partial).unloaded)
+            full = User.find_by_email('moved@example.com')
+            self.assertNotIn('oauth_id', sqlalchemy.inspect(full).unloaded)
+
+    def test_user_to_dict_cache(self):
+        """Test the cached user dict is copied and refreshed on changes"""
+        user = User(username='cached', email='cached@example.com', password='password123')
+        db.session.add(user)
+        db.session.commit()
+        
+        first = user.to_dict()
+        first['username'] = 'mutated'
+        self.assertEqual(user.to_dict()['username'], 'cached')
+        
+        user.is_verified = True
+        self.assertTrue(user.to_dict()['is_verified'])
+        db.session.commit()
+        self.assertEqual(user.to_dict(), User.find_dict_by_id(user.id))
 
     def test_user_to_dict(self):
         """Test user serialization to dictionary"""
@@ -305,6 +619,207 @@ class TestUserModel(unittest.TestCase):
         # Test with sensitive data
         user_dict_sensitive = user.to_dict(include_sensitive=True)
         self.assertIn('password_hash', user_dict_sensitive)
+        
+        # created_at is left to the JSON provider, which writes ISO 8601
+        db.session.add(user)
+        db.session.commit()
+        created_at = user.to_dict()['created_at']
+        self.assertIsInstance(created_at, datetime)
+        self.assertEqual(OrjsonProvider(self.app).loads(OrjsonProvider(self.app).dumps(user.to_dict()))['created_at'],
+                         created_at.isoformat())
+
+class RouteTestCase(unittest.TestCase):
+    """Drives the API app from App.py through its test client, on an
+    in-memory database per test class"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Build an app from App.py"""
+        # Importing App.py builds its module-level app from the environment
+        with mock.patch.dict(os.environ, {'DATABASE_URL': 'sqlite://'}):
+            from backend import App
+        cls.App = App
+        cls.app = App.create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'TESTING': True,
+            'BCRYPT_LOG_ROUNDS': 4
+        })
+
+    @classmethod
+    def tearDownClass(cls):
+        """Close the class's database"""
+        with cls.app.app_context():
+            db.engine.dispose()
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """Delete all rows and forget cached users, tokens and logins"""
+        with self.app.app_context():
+            db.session.remove()
+            with db.engine.begin() as connection:
+                for table in reversed(db.metadata.sorted_tables):
+                    connection.execute(table.delete())
+        for cache in (self.App._user_dict_cache, self.App._issued_token_cache,
+                      self.App._login_cache, self.App._failed_login_cache):
+            cache.clear()
+
+    def register(self, username, email='', password='password123'):
+        """Register a user through the API and return the response"""
+        return self.client.post('/api/auth/register', json={
+            'username': username,
+            'email': email or f'{username}@example.com',
+            'password': password
+        })
+
+    def auth_headers(self, username):
+        """Register a user and return (user id, Authorization headers)"""
+        data = self.register(username).get_json()
+        return data['user']['id'], {'Authorization': f"Bearer {data['token']}"}
+
+class TestAuthRoutes(RouteTestCase):
+    """Test the auth endpoints"""
+
+    def test_single_models_instance(self):
+        """The suite and the app share one models module, one db and one metadata"""
+        self.assertIs(sys.modules['backend.models'], models)
+        self.assertNotIn('models', sys.modules)
+        self.assertIs(self.App.db, db)
+        self.assertIs(self.App.User, User)
+        self.assertEqual(sorted(db.metadata.tables),
+                         ['follow', 'password_reset_token', 'post', 'profile', 'user', 'waitlist_entries'])
+
+    def test_single_auth_utils_instance(self):
+        """The suite and the app share one auth_utils, and with it one token cache"""
+        self.assertIs(sys.modules['backend.auth_utils'], auth_utils)
+        self.assertIs(self.App.decode_jwt, decode_jwt)
+        for name in ('auth_utils', 'json_provider', 'App'):
+            self.assertNotIn(name, sys.modules)
+
+    def test_malformed_tokens_rejected(self):
+        """Token ids that are not plain ASCII digits or overflow an integer column give 400"""
+        for token in ('\u00b2.x', '9' * 5000 + '.x', '9' * 20 + '.x', 'abc'):
+            response = self.client.get('/api/auth/verify-email', query_string={'token': token})
+            self.assertEqual(response.status_code, 400, token[:20])
+            response = self.client.post('/api/auth/reset-password',
+                                        json={'token': token, 'password': 'newpassword123'})
+            self.assertEqual(response.status_code, 400, token[:20])
+
+    def test_app_logging(self):
+        """Info lines are emitted, and every app built from App.py shares one queued handler"""
+        self.assertTrue(self.app.logger.isEnabledFor(logging.INFO))
+        self.assertEqual(len(self.app.logger.handlers), 1)
+
+    def test_login_unknown_email(self):
+        """Unknown emails are checked against the app's dummy hash at its configured cost"""
+        dummy_hash = self.app.extensions['dummy_password_hash']
+        self.assertTrue(dummy_hash.startswith('$2b$04$'))
+        response = self.client.post('/api/auth/login',
+                                    json={'email': 'nobody@example.com', 'password': 'password123'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_verification_email_sent_off_request(self):
+        """Registering hands the verification email to the mail pool and its SMTP relay"""
+        sent = []
+        delivered = threading.Event()
+        
+        def deliver(to, subject, text):
+            sent.append((threading.current_thread().name, to, 'verify-email?token=' in text))
+            delivered.set()
+        
+        with mock.patch.object(mailer, 'SMTP_HOST', 'smtp.example.com'), \
+                mock.patch.object(mailer, 'deliver', deliver):
+            self.assertEqual(self.register('mailuser').status_code, 201)
+            self.assertTrue(delivered.wait(5))
+        
+        thread_name, to, has_link = sent[0]
+        self.assertTrue(thread_name.startswith('mail'))
+        self.assertEqual((to, has_link), ('mailuser@example.com', True))
+
+    def test_login_after_failed_login_then_register(self):
+        """A login failure cached before registering does not block the new account"""
+        credentials = {'email': 'late@example.com', 'password': 'password123'}
+        self.assertEqual(self.client.post('/api/auth/login', json=credentials).status_code, 401)
+        self.assertEqual(self.register('late', **credentials).status_code, 201)
+        self.assertEqual(self.client.post('/api/auth/login', json=credentials).status_code, 200)
+
+class TestUserRoutes(RouteTestCase):
+    """Test the user, follow and dashboard endpoints"""
+
+    def test_me_etag(self):
+        """/me answers a matching If-None-Match with 304 and changes its ETag when the user does"""
+        user_id, headers = self.auth_headers('etaguser')
+        first = self.client.get('/api/auth/me', headers=headers)
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers['ETag']
+        
+        self.assertEqual(first.headers['Vary'], 'Authorization')
+        
+        cached = self.client.get('/api/auth/me', headers={**headers, 'If-None-Match': etag})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.data, b'')
+        self.assertEqual(cached.headers['Vary'], 'Authorization')
+        
+        with self.app.app_context():
+            user = db.session.get(User, user_id)
+            user.profile_picture = 'https://example.com/new.png'
+            db.session.commit()
+        
+        updated = self.client.get('/api/auth/me', headers={**headers, 'If-None-Match': etag})
+        self.assertEqual(updated.status_code, 200)
+        self.assertNotEqual(updated.headers['ETag'], etag)
+        self.assertEqual(updated.get_json()['user']['profile_picture'], 'https://example.com/new.png')
+
+    def test_me_after_user_deleted(self):
+        """Deleting a user evicts its cached dict"""
+        user_id, headers = self.auth_headers('goneuser')
+        self.assertEqual(self.client.get('/api/auth/me', headers=headers).status_code, 200)
+        
+        with self.app.app_context():
+            db.session.delete(db.session.get(User, user_id))
+            db.session.commit()
+        
+        self.assertEqual(self.client.get('/api/auth/me', headers=headers).status_code, 404)
+
+    def test_dashboard_feed_capped_per_followee(self):
+        """The feed holds each followed user's 5 newest posts, newest first"""
+        _, headers = self.auth_headers('reader')
+        author_ids = [self.auth_headers(name)[0] for name in ('author1', 'author2')]
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        with self.app.app_context():
+            db.session.add_all([
+                Post(user_id=author_id, content=f'post {i}', created_at=start + timedelta(minutes=i))
+                for author_id in author_ids for i in range(7)
+            ])
+            db.session.commit()
+        for author_id in author_ids:
+            self.client.post(f'/api/users/{author_id}/follow', headers=headers)
+        
+        response = self.client.get('/api/dashboard', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Vary'], 'Authorization')
+        feed = response.get_json()['feed']
+        self.assertEqual(len(feed), 10)
+        for author_id in author_ids:
+            self.assertEqual([post['content'] for post in feed if post['user_id'] == author_id],
+                             [f'post {i}' for i in range(6, 1, -1)])
+        self.assertEqual([post['created_at'] for post in feed],
+                         sorted((post['created_at'] for post in feed), reverse=True))
+
+    def test_follow_twice(self):
+        """Following a user again keeps the one follow and reports it"""
+        _, headers = self.auth_headers('follower')
+        followee_id, _ = self.auth_headers('followee')
+        
+        first = self.client.post(f'/api/users/{followee_id}/follow', headers=headers)
+        self.assertEqual(first.status_code, 201)
+        again = self.client.post(f'/api/users/{followee_id}/follow', headers=headers)
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.get_json()['message'], 'Already following')
+        with self.app.app_context():
+            self.assertEqual(db.session.query(Follow).count(), 1)
 
 if __name__ == '__main__':
     unittest.main()
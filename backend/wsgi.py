@@ -0,0 +1,21 @@
+"""WSGI entrypoint for running the API under gunicorn.
+
+With gevent workers (the default), gevent has to patch the standard library
+before Flask, SQLAlchemy or any database driver is imported, so the patching
+happens at the very top.
+"""
+
+import os
+
+if os.getenv('GUNICORN_WORKER_CLASS', 'gevent') == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:
+        pass  # Not using psycopg2 (e.g. SQLite in development)
+    else:
+        patch_psycopg()  # Let PostgreSQL queries yield to other greenlets
+
+from backend.App import app  # noqa: E402